@@ -1,75 +1,65 @@
+import os
 import streamlit as st
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import pandas as pd
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from dotenv import load_dotenv
 from supabase import create_client
 import time
+from concurrent.futures import as_completed
+from candle_store import CandleStore
 from data_fetcher import CoinbaseAPI
+from data_hub import DataHub
+from downsampling import candle_colors, downsample_ohlcv, lttb
+from live_charts import LiveCandlestickChart, LivePredictionChart
+from metrics import REGISTRY, start_metrics_server
+
+PANEL_RENDER_SECONDS = REGISTRY.histogram('dashboard_panel_render_seconds', 'Time to build and draw one dashboard panel.')
+REFRESH_SECONDS = REGISTRY.histogram('dashboard_refresh_seconds', 'Time of one dashboard refresh by view.')
+PANEL_ERRORS = REGISTRY.counter('dashboard_panel_errors_total', 'Panels that showed an error instead of data.')
+
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Serves /metrics (Prometheus) and /metrics.json once per server process when METRICS_PORT is set."""
+    port = os.getenv('METRICS_PORT')
+    return start_metrics_server(int(port)) if port else None
+
+
+@st.cache_resource
+def get_data_hub():
+    """One data layer per server process, shared by every session."""
+    load_dotenv()
+    supabase = create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+    # A local Parquet candle store, when configured, replaces the Supabase history query.
+    store_path = os.getenv('CANDLE_STORE_PATH')
+    return DataHub(supabase, CoinbaseAPI(), candle_store=CandleStore(store_path) if store_path else None)
+
 
 class LiveCryptoDashboard:
-    def __init__(self):
-        load_dotenv()
-        self.api = CoinbaseAPI()
-        self.supabase_url = st.secrets["SUPABASE_URL"]
-        self.supabase_key = st.secrets["SUPABASE_KEY"]
-        self.supabase = create_client(self.supabase_url, self.supabase_key)
+    def __init__(self, hub=None):
+        self.hub = hub or get_data_hub()
+        self.api = self.hub.api
+        self.supabase = self.hub.supabase
 
     def get_products_from_database(self):
         """Retrieve product IDs from the `crypto_products` table."""
-        query = self.supabase.table('crypto_products').select('product_id').execute()
-        if query.data:
-            return [item['product_id'] for item in query.data]
-        return []
+        return self.hub.get_products()
     
     def fetch_historical_data(self, product_id, days):
-        """Fetch historical data for the selected trading pair."""
-        end_time = datetime.now(timezone.utc)
-        start_time = end_time - timedelta(days=days)
-        print(start_time, end_time)
-        query = (
-            self.supabase.table('coinbase_data')
-            .select('*')
-            .eq('product_id', product_id)
-            .gte('time', start_time.isoformat())
-            .lte('time', end_time.isoformat())
-            .order('time')
-            .execute()
-        )
-        if query.data:
-            df = pd.DataFrame(query.data)
-            df['time'] = pd.to_datetime(df['time'], utc=True)
-            return df
-        return pd.DataFrame()
+        """Fetch historical data (with technical indicators) for the selected trading pair."""
+        return self.hub.get_history(product_id, days)
 
     def fetch_predictions(self, product_id, days):
         """Fetch prediction data for the selected trading pair."""
-        current_time = datetime.now(timezone.utc)
-        start_time = current_time - timedelta(days=days)
-        print('f',start_time, current_time)
-        query = (
-            self.supabase.table('coinbase_predictions')
-            .select('*')
-            .eq('product_id', product_id)
-            .gte('prediction_date', start_time.isoformat())  # Predictions for the last day
-            .order('prediction_date')
-            .execute()
-        )
-        if query.data:
-            df = pd.DataFrame(query.data)
-            #print(df.iloc[0])
-
-            # Convert 'prediction_date' to datetime
-            df['prediction_date'] = pd.to_datetime(
-                df['prediction_date'], utc=True  # Use 'mixed' to handle variations
-            )
-            return df
-        return pd.DataFrame()
+        return self.hub.get_predictions(product_id, days)
 
 
     def predictions_chart(self, historical_df, prediction_df, selected_pair):
         """Create an enhanced combined chart of historical data and predictions."""
+        # LTTB keeps the shape of long lines while sending at most a few hundred points to the browser.
+        historical_df = lttb(historical_df, 'time', 'close')
+        prediction_df = lttb(prediction_df, 'prediction_date', 'predicted_price')
         fig = make_subplots(
             rows=1, cols=1, shared_xaxes=True, vertical_spacing=0.03,
             subplot_titles=(f'{selected_pair} Price Chart with Predictions',)
@@ -136,65 +126,21 @@ class LiveCryptoDashboard:
     
     def calculate_yoy_mom_changes(self, product_id):
         """Calculate Year-over-Year and Month-over-Month changes."""
-        end_time = datetime.now(timezone.utc)
-        one_year_ago = end_time - timedelta(days=365)
-        one_month_ago = end_time - timedelta(days=30)
-
-        # Query for the closest record to one year ago
-        year_ago_query = (
-            self.supabase.table('coinbase_data')
-            .select('*')
-            .eq('product_id', product_id)
-            .lte('time', one_year_ago.isoformat())
-            .order('time', desc=True)
-            .limit(1)
-            .execute()
-        )
-        year_ago_price = (
-            year_ago_query.data[0]['close'] if year_ago_query.data else None
-        )
-
-        # Query for the closest record to one month ago
-        month_ago_query = (
-            self.supabase.table('coinbase_data')
-            .select('*')
-            .eq('product_id', product_id)
-            .lte('time', one_month_ago.isoformat())
-            .order('time', desc=True)
-            .limit(1)
-            .execute()
-        )
-        month_ago_price = (
-            month_ago_query.data[0]['close'] if month_ago_query.data else None
-        )
-
-        #print(f"Current Price: {current_price}")
-        print(f"Year Ago Price: {year_ago_price}")
-        print(f"Month Ago Price: {month_ago_price}")
-
-        return year_ago_price, month_ago_price
-        
+        reference = self.hub.get_reference_prices(product_id, (365, 30))
+        return reference[365], reference[30]
 
     def calculate_technical_indicators(self, df):
-        df['SMA20'] = df['close'].rolling(window=20).mean()
-        df['EMA20'] = df['close'].ewm(span=20, adjust=False).mean()
-        df['Volume_SMA20'] = df['volume'].rolling(window=20).mean()
-        df['Daily_Range'] = df['high'] - df['low']
-        df['Range_SMA10'] = df['Daily_Range'].rolling(window=10).mean()
-        return df
+        """Attach SMA20, EMA20, Volume_SMA20, Daily_Range and Range_SMA10."""
+        return self.hub.calculate_indicators(df)
 
     def get_ticker_data(self, product_id):
-        ticker = self.api.get_ticker(product_id)
-        return {
-            'price': float(ticker['price']),
-            'volume': float(ticker['volume']),
-            'bid': float(ticker['bid']),
-            'ask': float(ticker['ask']),
-            'time': datetime.fromisoformat(ticker['time'].replace('Z', '+00:00'))
-        }
+        """Latest ticker from the shared WebSocket feed, falling back to REST when it is stale."""
+        return self.hub.get_ticker(product_id)
     
 
     def create_candlestick_chart(self, df, selected_pair):
+        # Long timeframes are drawn with coarser candles (e.g. 4h for a month of 15-minute data).
+        df = downsample_ohlcv(df)
         fig = make_subplots(rows = 2, cols = 1, 
                             shared_xaxes=True,
                             vertical_spacing=0.03,
@@ -209,8 +155,7 @@ class LiveCryptoDashboard:
             name = 'OHLC'
         ), 
         row = 1, col = 1)
-        colors = ['red' if close < open else 'green' 
-                 for close, open in zip(df['close'], df['open'])]
+        colors = candle_colors(df)
         
         fig.add_trace(go.Bar(
             x=df['time'],
@@ -228,38 +173,274 @@ class LiveCryptoDashboard:
         )
         return fig
 
+    def render_metrics(self, historical_df, ticker_data, year_ago_price, month_ago_price):
+        """Render the price & volume and the technical & historical metric rows."""
+        latest = historical_df.iloc[-1]
+        yoy_change = (((latest['close'] - year_ago_price) / year_ago_price) * 100 if year_ago_price else None )
+        mom_change = (((latest['close'] - month_ago_price) / month_ago_price) * 100 if month_ago_price else None)
+        st.markdown("### Price & Volume Metrics")
+        col1, col2, col3= st.columns(3)
+
+        # Current Price
+        col1.metric(
+            "💲 Current Price",
+            f"${ticker_data['price']:.2f}",
+            f"{((ticker_data['price'] - latest['open']) / latest['open']) * 100:.2f}%",
+            help="The current price of the selected trading pair."
+        )
+
+        # Volume
+        col2.metric(
+            "📊 Volume",
+            f"{ticker_data['volume']:.2f}",
+            f"{((ticker_data['volume'] - historical_df['volume'].mean()) / historical_df['volume'].mean()) * 100:.2f}%",
+            help="The trading volume compared to the 20-period average."
+        )
+
+        # Daily Range
+        col3.metric(
+            "📈 Daily Range",
+            f"${latest['Daily_Range']:.2f}",
+            f"Avg: ${latest['Range_SMA10']:.2f}",
+            help="The price difference between the highest and lowest value today."
+        )
+
+        # # Daily Change
+        # col4.metric(
+        #     "📊 24h Change",
+        #     f"${ticker_data['price']:.2f}",
+        #     f"{((ticker_data['price'] - latest['open']) / latest['open']) * 100:.2f}%",
+        #     help="Price change in the last 24 hours."
+        # )
+
+        # Add some spacing between rows
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # Second Row - Technical Indicators and Historical Changes
+        st.markdown("### Technical & Historical Metrics")
+        col1, col2, col3, col4 = st.columns(4)
+
+        # SMA
+        col1.metric(
+            "📏 SMA (20 Days)",
+            f"${latest['SMA20']:.2f}",
+            f"{((latest['SMA20'] - latest['close']) / latest['close']) * 100:.2f}%",
+            help="Simple Moving Average over the last 20 days."
+        )
+
+        # EMA
+        col2.metric(
+            "📏 EMA (20 Days)",
+            f"${latest['EMA20']:.2f}",
+            f"{((latest['EMA20'] - latest['close']) / latest['close']) * 100:.2f}%",
+            help="Exponential Moving Average over the last 20 days."
+        )
+
+        # YoY Change
+        if year_ago_price is not None:
+            col3.metric(
+                "📅 YoY Change",
+                f"${year_ago_price:.2f}",
+                f"{yoy_change:+.2f}%",
+                help=f"Year over Year change. Price today: ${ticker_data['price']:.2f}"
+            )
+        else:
+            col3.metric(
+                "📅 YoY Change",
+                "N/A",
+                "No data",
+                help="Insufficient historical data for YoY calculation"
+            )
+
+        # MoM Change
+        if month_ago_price is not None:
+            col4.metric(
+                "📅 MoM Change",
+                f"${month_ago_price:.2f}",
+                f"{mom_change:+.2f}%",
+                help=f"Month over Month change. Price today: ${ticker_data['price']:.2f}"
+            )
+        else:
+            col4.metric(
+                "📅 MoM Change",
+                "N/A",
+                "No data",
+                help="Insufficient historical data for MoM calculation"
+            )
+
+    def get_live_charts(self, selected_pair, lookback_days):
+        """
+        Chart objects kept in the session so each refresh updates the previous figures in place.
+        Switching pair or timeframe starts from fresh figures (and resets zoom).
+        """
+        view = (selected_pair, lookback_days)
+        if st.session_state.get('live_charts_view') != view:
+            revision = f"{selected_pair}-{lookback_days}"
+            st.session_state['live_charts_view'] = view
+            st.session_state['live_charts'] = {
+                'candlestick': LiveCandlestickChart(lambda df: self.create_candlestick_chart(df, selected_pair), revision),
+                'prediction': LivePredictionChart(
+                    lambda historical_df, prediction_df: self.predictions_chart(historical_df, prediction_df, selected_pair),
+                    revision
+                )
+            }
+        return st.session_state['live_charts']
+
+    def render_live_view(self, selected_pair, lookback_days):
+        """
+        Load the metrics and chart data concurrently and render each panel as soon as its inputs arrive.
+        Runs as a Streamlit fragment, so a refresh re-runs only this view instead of the whole script.
+        """
+        started = time.perf_counter()
+        metrics_placeholder = st.empty()
+        tab1, tab2 = st.tabs(["📈 Candlestick Chart", "🔮 Prediction Chart"])
+        with tab1:
+            candlestick_placeholder = st.empty()
+        with tab2:
+            prediction_placeholder = st.empty()
+        last_updated_placeholder = st.empty()
+        live_charts = self.get_live_charts(selected_pair, lookback_days)
+        chart_key = f"{selected_pair}_{lookback_days}"
+
+        # Panel -> (data it needs, where it is drawn)
+        panels = {
+            'metrics': (('history', 'ticker', 'reference_prices'), metrics_placeholder),
+            'candlestick': (('history',), candlestick_placeholder),
+            'prediction': (('history', 'predictions'), prediction_placeholder)
+        }
+        futures = self.hub.snapshot_futures(selected_pair, lookback_days)
+        names = {future: name for name, future in futures.items()}
+        data = {}
+        errors = {}
+
+        for future in as_completed(names):
+            name = names[future]
+            try:
+                data[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+
+            for panel, (sources, placeholder) in list(panels.items()):
+                if not all(source in data or source in errors for source in sources):
+                    continue
+                del panels[panel]
+                failed = [source for source in sources if source in errors]
+                if failed:
+                    PANEL_ERRORS.inc(panel=panel)
+                    placeholder.error(f"Error updating dashboard: {str(errors[failed[0]])}")
+                    continue
+                historical_df = data['history']
+                if historical_df.empty:
+                    continue
+                try:
+                    with PANEL_RENDER_SECONDS.time(panel=panel):
+                        if panel == 'metrics':
+                            reference = data['reference_prices']
+                            with placeholder.container():
+                                self.render_metrics(historical_df, data['ticker'], reference[365], reference[30])
+                        elif panel == 'candlestick':
+                            candlestick_chart = live_charts['candlestick'].update(historical_df)
+                            placeholder.plotly_chart(candlestick_chart, use_container_width=True, key=f"candlestick_chart_{chart_key}")
+                        else:
+                            pred_chart = live_charts['prediction'].update(historical_df, data['predictions'])
+                            placeholder.plotly_chart(pred_chart, use_container_width=True, key=f"prediction_chart_{chart_key}")
+                except Exception as e:
+                    PANEL_ERRORS.inc(panel=panel)
+                    placeholder.error(f"Error updating dashboard: {str(e)}")
+
+        last_updated_placeholder.markdown(
+            f"<div class='last-updated'>Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</div>",
+            unsafe_allow_html=True
+        )
+        REFRESH_SECONDS.observe(time.perf_counter() - started, view='single')
+
+    def render_overview(self, trading_pairs):
+        """Market overview of every pair, built from one batched query per data source."""
+        started = time.perf_counter()
+        overview = self.hub.get_overview(trading_pairs)
+        st.markdown("### Market Overview")
+        if overview.empty:
+            st.info("No market data available yet.")
+            return
+        percent = "%+.2f%%"
+        st.dataframe(
+            overview.drop(columns=['updated']),
+            hide_index=True,
+            use_container_width=True,
+            height=min(35 * (len(overview) + 1) + 3, 800),
+            column_config={
+                'product_id': st.column_config.TextColumn("Pair"),
+                'price': st.column_config.NumberColumn("💲 Price", format="$%.4f"),
+                'change_24h': st.column_config.NumberColumn("24h Change", format=percent),
+                'change_7d': st.column_config.NumberColumn("7d Change", format=percent),
+                'change_30d': st.column_config.NumberColumn("30d Change", format=percent),
+                'sma_deviation': st.column_config.NumberColumn(
+                    "vs SMA20", format=percent, help="Current price relative to the 20-period SMA."
+                ),
+                'ema_deviation': st.column_config.NumberColumn(
+                    "vs EMA20", format=percent, help="Current price relative to the 20-period EMA."
+                ),
+                'sparkline': st.column_config.LineChartColumn("📈 Last 24 Hours"),
+                'predicted_price': st.column_config.NumberColumn("🔮 Latest Prediction", format="$%.4f"),
+                'prediction_date': st.column_config.DatetimeColumn("Prediction Time", format="YYYY-MM-DD HH:mm")
+            }
+        )
+        st.markdown(
+            f"<div class='last-updated'>Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</div>",
+            unsafe_allow_html=True
+        )
+        REFRESH_SECONDS.observe(time.perf_counter() - started, view='overview')
+
     def run_dashboard(self):
         st.set_page_config(page_title='Real-time Crypto Dashboard', layout='wide')
+        start_metrics_endpoint()
         st.title("Real-time Cryptocurrency Dashboard")
         st.sidebar.header("Settings")
 
         product_ids = self.get_products_from_database()
         trading_pairs = sorted(product_ids)
-        default_index = trading_pairs.index('ETH-USD') if 'ETH-USD' in trading_pairs else 0
-        selected_pair = st.sidebar.selectbox(
-                "Select Trading Pair:",
-                trading_pairs,
-                index=default_index,
-                help="Choose a cryptocurrency pair (e.g., BTC-USD) to analyze."
+        self.hub.start_stream(trading_pairs)
+        view = st.sidebar.radio(
+            "View:",
+            ["Single Pair", "Market Overview"],
+            help="Market Overview shows every pair at once."
+        )
+        if view == "Single Pair":
+            default_index = trading_pairs.index('ETH-USD') if 'ETH-USD' in trading_pairs else 0
+            selected_pair = st.sidebar.selectbox(
+                    "Select Trading Pair:",
+                    trading_pairs,
+                    index=default_index,
+                    help="Choose a cryptocurrency pair (e.g., BTC-USD) to analyze."
+                )
+
+            timeframe_options = {
+                "Last 24 Hours": 1,
+                "Last 3 Days": 3,
+                "Last Week": 7,
+                "Last 2 Weeks": 14,
+                "Last Month": 30
+            }
+            selected_timeframe = st.sidebar.selectbox(
+                "Select Timeframe:",
+                list(timeframe_options.keys()),
+                help="Select the historical timeframe to display (e.g., last week, last month)."
             )
+            lookback_days = timeframe_options[selected_timeframe]
 
-        timeframe_options = {
-            "Last 24 Hours": 1,
-            "Last 3 Days": 3,
-            "Last Week": 7,
-            "Last 2 Weeks": 14,
-            "Last Month": 30
+        refresh_options = {
+            "Every 15 Seconds": 15,
+            "Every 30 Seconds": 30,
+            "Every Minute": 60,
+            "Every 5 Minutes": 300
         }
-        selected_timeframe = st.sidebar.selectbox(
-            "Select Timeframe:",
-            list(timeframe_options.keys()),
-            help="Select the historical timeframe to display (e.g., last week, last month)."
+        selected_refresh = st.sidebar.selectbox(
+            "Refresh Interval:",
+            list(refresh_options.keys()),
+            index=2,
+            help="How often the metrics and charts reload. Only the live view re-runs on refresh."
         )
-        lookback_days = timeframe_options[selected_timeframe]
-
-        metrics_placeholder = st.empty()
-        chart_selection_placeholder = st.empty()
-        visualization_placeholder = st.empty()
+        refresh_interval = refresh_options[selected_refresh]
 
         st.markdown(
         """
@@ -275,137 +456,11 @@ class LiveCryptoDashboard:
         """,
         unsafe_allow_html=True
     )
-        last_updated_placeholder = st.empty()
-        with st.empty():
-            while True: 
-                try:
-                    historical_df = self.fetch_historical_data(selected_pair, days=lookback_days)
-                    prediction_df = self.fetch_predictions(selected_pair, days=lookback_days)
-                    print('pred', prediction_df['prediction_date'].max(), prediction_df['prediction_date'].min())
-                    ticker_data = self.get_ticker_data(selected_pair)
-                    year_ago_price, month_ago_price = self.calculate_yoy_mom_changes(selected_pair)
-                   
-                    if not historical_df.empty:
-                        historical_df = self.calculate_technical_indicators(historical_df)
-                        print('his',historical_df['time'].max(), historical_df['time'].min())
-                    
-                        # Display technical indicators
-                        with metrics_placeholder.container():
-                            latest = historical_df.iloc[-1]
-                            yoy_change = (((latest['close'] - year_ago_price) / year_ago_price) * 100 if year_ago_price else None )
-                            mom_change = (((latest['close'] - month_ago_price) / month_ago_price) * 100 if month_ago_price else None)
-                            st.markdown("### Price & Volume Metrics")
-                            col1, col2, col3= st.columns(3)
-                            
-                            # Current Price
-                            col1.metric(
-                                "💲 Current Price",
-                                f"${ticker_data['price']:.2f}",
-                                f"{((ticker_data['price'] - latest['open']) / latest['open']) * 100:.2f}%",
-                                help="The current price of the selected trading pair."
-                            )
-                            
-                            # Volume
-                            col2.metric(
-                                "📊 Volume",
-                                f"{ticker_data['volume']:.2f}",
-                                f"{((ticker_data['volume'] - historical_df['volume'].mean()) / historical_df['volume'].mean()) * 100:.2f}%",
-                                help="The trading volume compared to the 20-period average."
-                            )
-                            
-                            # Daily Range
-                            col3.metric(
-                                "📈 Daily Range",
-                                f"${latest['Daily_Range']:.2f}",
-                                f"Avg: ${latest['Range_SMA10']:.2f}",
-                                help="The price difference between the highest and lowest value today."
-                            )
-                            
-                            # # Daily Change
-                            # col4.metric(
-                            #     "📊 24h Change",
-                            #     f"${ticker_data['price']:.2f}",
-                            #     f"{((ticker_data['price'] - latest['open']) / latest['open']) * 100:.2f}%",
-                            #     help="Price change in the last 24 hours."
-                            # )
-                            
-                            # Add some spacing between rows
-                            st.markdown("<br>", unsafe_allow_html=True)
-                            
-                            # Second Row - Technical Indicators and Historical Changes
-                            st.markdown("### Technical & Historical Metrics")
-                            col1, col2, col3, col4 = st.columns(4)
-                            
-                            # SMA
-                            col1.metric(
-                                "📏 SMA (20 Days)",
-                                f"${latest['SMA20']:.2f}",
-                                f"{((latest['SMA20'] - latest['close']) / latest['close']) * 100:.2f}%",
-                                help="Simple Moving Average over the last 20 days."
-                            )
-                            
-                            # EMA
-                            col2.metric(
-                                "📏 EMA (20 Days)",
-                                f"${latest['EMA20']:.2f}",
-                                f"{((latest['EMA20'] - latest['close']) / latest['close']) * 100:.2f}%",
-                                help="Exponential Moving Average over the last 20 days."
-                            )
-                            
-                            # YoY Change
-                            if year_ago_price is not None:
-                                col3.metric(
-                                    "📅 YoY Change",
-                                    f"${year_ago_price:.2f}",
-                                    f"{yoy_change:+.2f}%",
-                                    help=f"Year over Year change. Price today: ${ticker_data['price']:.2f}"
-                                )
-                            else:
-                                col3.metric(
-                                    "📅 YoY Change",
-                                    "N/A",
-                                    "No data",
-                                    help="Insufficient historical data for YoY calculation"
-                                )
-                            
-                            # MoM Change
-                            if month_ago_price is not None:
-                                col4.metric(
-                                    "📅 MoM Change",
-                                    f"${month_ago_price:.2f}",
-                                    f"{mom_change:+.2f}%",
-                                    help=f"Month over Month change. Price today: ${ticker_data['price']:.2f}"
-                                )
-                            else:
-                                col4.metric(
-                                    "📅 MoM Change",
-                                    "N/A",
-                                    "No data",
-                                    help="Insufficient historical data for MoM calculation"
-                                )
-
-
-                        tab1, tab2 = st.tabs(["📈 Candlestick Chart", "🔮 Prediction Chart"])
-                        timestamp_key = int(time.time()) 
-                        # Tab 1: Candlestick Chart
-                        with tab1:
-                            candlestick_chart = self.create_candlestick_chart(historical_df, selected_pair)
-                            st.plotly_chart(candlestick_chart, use_container_width=True, key=f"candlestick_chart_{timestamp_key}")  # Use `st.plotly_chart` directly for this tab
-
-                        # Tab 2: Prediction Chart
-                        with tab2:
-                            pred_chart = self.predictions_chart(historical_df, prediction_df, selected_pair)
-                            st.plotly_chart(pred_chart, use_container_width=True, key=f"prediction_chart_{timestamp_key}")  # Use `st.plotly_chart` directly for this tab
-                    
-                        last_updated_placeholder.markdown(
-                        f"<div class='last-updated'>Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</div>",
-                        unsafe_allow_html=True
-                    )
-                    time.sleep(60)
-
-                except Exception as e:
-                    st.error(f"Error updating dashboard: {str(e)}")
-                    time.sleep(5)
+        # Re-runs on a timer without blocking the script thread or reloading the rest of the page.
+        if view == "Market Overview":
+            st.fragment(self.render_overview, run_every=refresh_interval)(trading_pairs)
+        else:
+            st.fragment(self.render_live_view, run_every=refresh_interval)(selected_pair, lookback_days)
 
 if __name__ == '__main__':
     dashboard = LiveCryptoDashboard()
@@ -0,0 +1,540 @@
+"""
+Reproducible performance benchmarks.
+
+Times the hot paths of the project on synthetic candles, against a local mock of the Coinbase
+REST endpoints and an in-process stand-in for the Supabase query builder, so runs do not depend
+on the network or on live data:
+
+    get_candles        CoinbaseAPI.get_candles / get_candles_range throughput
+    indicators         dashboard indicators on a full frame, and one streamed candle
+    windowing          sliding_windows / split_and_scale_windows
+    candle_buffer      CandleBuffer ingest, appends, model windows and DataFrame view vs a deque
+    charts             candlestick and prediction figure build + JSON serialization
+    refresh            one dashboard refresh (concurrent loads, metrics, both charts)
+
+Results are written as JSON together with the git commit and library versions, and `--compare`
+prints the change against an earlier result file.
+
+Usage:
+    python benchmark.py --output benchmarks/$(git rev-parse --short HEAD).json
+    python benchmark.py --quick --compare benchmarks/abc1234.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+GRANULARITY = 900
+SIZES = (1_000, 10_000, 100_000)
+QUICK_SIZES = (1_000, 10_000)
+REFRESH_DAYS = (1, 7, 30)
+
+
+def synthetic_candles(n, granularity=GRANULARITY, end=None, seed=0, start_price=2000.0):
+    """
+    Geometric random-walk OHLCV candles with the columns of `CoinbaseAPI.get_candles`.
+    Parameters:
+    - n: Number of candles.
+    - granularity: Candle size in seconds.
+    - end: Time of the last candle (defaults to the last closed candle before now, UTC).
+    - seed: Seed of the random walk, so every run sees the same data.
+    - start_price: Price of the first candle.
+    """
+    rng = np.random.default_rng(seed)
+    if end is None:
+        end = pd.Timestamp.now(tz='UTC').floor(f'{granularity}s') - pd.Timedelta(seconds=granularity)
+    times = pd.date_range(end=end, periods=n, freq=f'{granularity}s')
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    wick = np.abs(rng.normal(0, 0.001, (2, n))) * close
+    return pd.DataFrame({
+        'time': times,
+        'low': np.minimum(open_, close) - wick[0],
+        'high': np.maximum(open_, close) + wick[1],
+        'open': open_,
+        'close': close,
+        'volume': rng.gamma(2.0, 50.0, n)
+    })
+
+
+def synthetic_predictions(candles, steps=6, granularity=GRANULARITY):
+    """One prediction per candle plus `steps` ahead of the last one, like `coinbase_predictions`."""
+    last = candles['time'].iloc[-1]
+    future = pd.date_range(last + pd.Timedelta(seconds=granularity), periods=steps, freq=f'{granularity}s')
+    dates = pd.concat([candles['time'].iloc[1:], pd.Series(future)], ignore_index=True)
+    prices = np.concatenate([candles['close'].to_numpy()[:-1], np.full(steps, candles['close'].iloc[-1])])
+    return pd.DataFrame({'prediction_date': dates, 'predicted_price': prices * 1.001})
+
+
+class _CoinbaseHandler(BaseHTTPRequestHandler):
+    """Serves the Coinbase Exchange endpoints used by `CoinbaseAPI` from deterministic candles."""
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if parts == ['products']:
+            return self._send([{'id': product_id} for product_id in self.server.product_ids])
+        if len(parts) == 3 and parts[0] == 'products' and parts[2] == 'candles':
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            return self._send(self._candles(query))
+        if len(parts) == 3 and parts[0] == 'products' and parts[2] == 'ticker':
+            return self._send({
+                'price': '2000.00', 'volume': '12345.6', 'bid': '1999.99', 'ask': '2000.01',
+                'time': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+            })
+        self.send_error(404)
+
+    def _candles(self, query):
+        granularity = int(query['granularity'])
+        start = int(pd.Timestamp(query['start']).timestamp()) // granularity * granularity
+        end = int(pd.Timestamp(query['end']).timestamp())
+        times = np.arange(start, end + 1, granularity)[:300]
+        close = 2000 + 20 * np.sin(times / 86400.0) + (times * 2654435761 % 1000) / 100.0
+        # Newest first, like the real endpoint.
+        return [
+            [int(t), c - 1.0, c + 1.0, c - 0.5, c, 10.0]
+            for t, c in zip(times[::-1].tolist(), close[::-1].tolist())
+        ]
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockCoinbaseServer:
+    """Local HTTP server with the Coinbase REST endpoints; use as a context manager."""
+
+    def __init__(self, product_ids=('BTC-USD', 'ETH-USD'), latency=0.0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _CoinbaseHandler)
+        self.server.daemon_threads = True
+        self.server.product_ids = list(product_ids)
+        self.server.latency = latency
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _FakeQuery:
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.columns = None
+        self.filters = []
+        self.orders = []
+        self.bounds = None
+        self.rows = None
+
+    def select(self, columns):
+        self.columns = None if columns == '*' else columns.split(',')
+        return self
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda df: df[column] == value)
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        if column in self.client.time_columns:
+            values = pd.to_datetime(values, utc=True)
+        self.filters.append(lambda df: df[column].isin(values))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda df: df[column] >= self.client.coerce(column, value))
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda df: df[column] <= self.client.coerce(column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end + 1)
+        return self
+
+    def limit(self, count):
+        self.bounds = (0, count)
+        return self
+
+    def execute(self):
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        with self.client.lock:
+            self.client.calls.append(self.table)
+        if self.rows is not None:
+            return _Response(self.rows)
+
+        df = self.client.tables[self.table]
+        mask = np.ones(len(df), dtype=bool)
+        for condition in self.filters:
+            mask &= condition(df).to_numpy()
+        df = df[mask]
+        if self.orders:
+            df = df.sort_values([c for c, _ in self.orders], ascending=[not d for _, d in self.orders], kind='stable')
+        start, end = self.bounds or (0, self.client.max_rows)
+        df = df.iloc[start:min(end, start + self.client.max_rows)]
+        if self.columns is not None:
+            df = df[self.columns]
+        df = df.copy()
+        for column in self.client.time_columns & set(df.columns):
+            df[column] = df[column].map(pd.Timestamp.isoformat)
+        return _Response(df.to_dict('records'))
+
+
+class FakeSupabase:
+    """
+    In-process stand-in for the Supabase client's query builder (select/eq/in_/gte/lte/order/
+    range/limit/insert/execute) over DataFrames, with PostgREST's row cap and optional latency.
+    """
+
+    time_columns = {'time', 'prediction_date'}
+
+    def __init__(self, tables, latency=0.0, max_rows=1000):
+        self.tables = tables
+        self.latency = latency
+        self.max_rows = max_rows
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def coerce(self, column, value):
+        return pd.Timestamp(value) if column in self.time_columns else value
+
+    def table(self, name):
+        return _FakeQuery(self, name)
+
+
+def measure(fn, repeat=5, warmup=1):
+    """Runs `fn` `warmup + repeat` times and returns timing statistics of the last `repeat` runs in seconds."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return {
+        'median': statistics.median(times),
+        'min': min(times),
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'repeat': repeat
+    }
+
+
+def _result(name, size, stats, **extra):
+    return {'name': name, 'size': size, **stats, **extra}
+
+
+def bench_get_candles(sizes, repeat):
+    """Client throughput with the rate limiter opened up, so the numbers measure our own overhead."""
+    from data_fetcher import MAX_CANDLES_PER_REQUEST, CoinbaseAPI
+
+    results = []
+    with MockCoinbaseServer() as server:
+        api = CoinbaseAPI(server.url, rate_limit=10_000, burst=10_000)
+        end = datetime.now(timezone.utc).replace(microsecond=0)
+        start = end - timedelta(seconds=GRANULARITY * (MAX_CANDLES_PER_REQUEST - 1))
+        stats = measure(lambda: api.get_candles('BTC-USD', start.isoformat(), end.isoformat(), GRANULARITY), repeat * 4)
+        results.append(_result('get_candles', MAX_CANDLES_PER_REQUEST, stats,
+                               candles_per_second=MAX_CANDLES_PER_REQUEST / stats['median']))
+        for size in sizes:
+            start = end - timedelta(seconds=GRANULARITY * (size - 1))
+            stats = measure(lambda: api.get_candles_range(['BTC-USD'], start, end, GRANULARITY), repeat)
+            results.append(_result('get_candles_range', size, stats, candles_per_second=size / stats['median']))
+        api.close()
+    return results
+
+
+def bench_indicators(sizes, repeat):
+    from data_hub import DataHub
+    from indicators import DASHBOARD_INDICATORS, IndicatorEngine
+
+    hub = DataHub(FakeSupabase({}), api=None)
+    results = []
+    for size in sizes:
+        df = synthetic_candles(size)
+        results.append(_result('indicators_full', size, measure(lambda: hub.calculate_indicators(df), repeat)))
+
+        # Streaming consumers (the inference service) feed one closed candle at a time to an engine
+        # that has already seen the window.
+        engine = IndicatorEngine(DASHBOARD_INDICATORS)
+        engine.update_many({name: df[name].to_numpy(dtype=float) for name in engine.input_names})
+        candle = df.iloc[-1].to_dict()
+        results.append(_result('indicators_update', size, measure(lambda: engine.update(candle), repeat)))
+    return results
+
+
+def bench_windowing(sizes, repeat, sequence_length=192):
+    from indicators import TRAINING_INDICATORS, compute_indicators
+    from train_pipeline import FEATURE_COLUMNS
+    from windowing import sliding_windows, split_and_scale_windows
+
+    results = []
+    for size in sizes:
+        if size <= sequence_length + 1:
+            continue
+        df = compute_indicators(synthetic_candles(size), TRAINING_INDICATORS).bfill()
+        features, target, dates = df[FEATURE_COLUMNS], df['close'], df['time']
+        arrays = (features.to_numpy(), target.to_numpy(), dates.to_numpy())
+        results.append(_result('sliding_windows', size, measure(
+            lambda: sliding_windows(*arrays, sequence_length), repeat
+        )))
+        results.append(_result('split_and_scale_windows', size, measure(
+            lambda: split_and_scale_windows(features, target, dates, sequence_length), repeat
+        )))
+    return results
+
+
+def bench_candle_buffer(sizes, repeat, sequence_length=192, windows=1_000):
+    """Columnar candle storage against the deque of rows (and the frame) it replaces."""
+    from candle_buffer import OHLCV_COLUMNS, CandleBuffer, to_epoch
+
+    results = []
+    for size in sizes:
+        df = synthetic_candles(size)
+        times, values = to_epoch(df['time']), df[OHLCV_COLUMNS].to_numpy()
+        buffer = CandleBuffer(size, OHLCV_COLUMNS)
+        buffer.extend(times, values)
+        results.append(_result(
+            'candle_buffer_extend_frame', size,
+            measure(lambda: CandleBuffer(size, OHLCV_COLUMNS).extend_frame(df), repeat),
+            bytes_per_candle=buffer.nbytes / size,
+            frame_bytes_per_candle=int(df.memory_usage(deep=True).sum()) / size
+        ))
+
+        def append_all():
+            appended = CandleBuffer(sequence_length, OHLCV_COLUMNS)
+            for candle_time, row in zip(times, values):
+                appended.append(candle_time, row)
+
+        def deque_append_all():
+            rows = deque(maxlen=sequence_length)
+            for row in values.tolist():
+                rows.append(row)
+
+        results.append(_result('candle_buffer_append', size, measure(append_all, repeat)))
+        results.append(_result('deque_append', size, measure(deque_append_all, repeat)))
+
+        rows = deque(values[-sequence_length:].tolist(), maxlen=sequence_length)
+        results.append(_result(f'candle_buffer_window_x{windows}', size, measure(
+            lambda: [buffer.window(sequence_length) for _ in range(windows)], repeat
+        )))
+        results.append(_result(f'deque_window_x{windows}', size, measure(
+            lambda: [np.asarray(rows, dtype=np.float64) for _ in range(windows)], repeat
+        )))
+        results.append(_result('candle_buffer_to_frame', size, measure(buffer.to_frame, repeat)))
+    return results
+
+
+def bench_charts(sizes, repeat):
+    dashboard = _dashboard(FakeSupabase({}), api=None)
+    results = []
+    for size in sizes:
+        df = dashboard.calculate_technical_indicators(synthetic_candles(size))
+        predictions = synthetic_predictions(df)
+        for name, build in (
+            ('candlestick_chart', lambda: dashboard.create_candlestick_chart(df, 'BTC-USD')),
+            ('predictions_chart', lambda: dashboard.predictions_chart(df, predictions, 'BTC-USD'))
+        ):
+            payload = len(build().to_json())
+            results.append(_result(f'{name}_build', size, measure(build, repeat), payload_bytes=payload))
+            figure = build()
+            results.append(_result(f'{name}_serialize', size, measure(figure.to_json, repeat)))
+    return results
+
+
+def bench_refresh(days_list, repeat, latency):
+    """
+    One refresh of the single-pair view, as the Streamlit fragment runs it, against backends
+    answering after `latency` seconds. `cold` drops the hub's cache first; `warm` is served from it.
+    """
+    results = []
+    product_ids = ['BTC-USD', 'ETH-USD']
+    with MockCoinbaseServer(product_ids, latency=latency) as server:
+        for days in days_list:
+            size = days * 86400 // GRANULARITY
+            candles, predictions = [], []
+            for i, product_id in enumerate(product_ids):
+                # A year and a bit of history so the YoY/MoM references resolve.
+                df = synthetic_candles(size + 400 * 96, seed=i)
+                candles.append(df.assign(product_id=product_id))
+                predictions.append(synthetic_predictions(df.iloc[-size:]).assign(product_id=product_id))
+            supabase = FakeSupabase({
+                'coinbase_data': pd.concat(candles, ignore_index=True),
+                'coinbase_predictions': pd.concat(predictions, ignore_index=True),
+                'crypto_products': pd.DataFrame({'product_id': product_ids})
+            }, latency=latency)
+
+            from data_fetcher import CoinbaseAPI
+            api = CoinbaseAPI(server.url, rate_limit=10_000, burst=10_000)
+            dashboard = _dashboard(supabase, api)
+
+            def cold():
+                dashboard.hub.cache = type(dashboard.hub.cache)()
+                dashboard.hub.history_cache.invalidate()
+                dashboard.hub.prediction_cache.invalidate()
+                dashboard.render_live_view('ETH-USD', days)
+
+            supabase.calls.clear()
+            dashboard.render_live_view('ETH-USD', days)
+            queries = len(supabase.calls)
+            results.append(_result('refresh_cold', size, measure(cold, repeat), days=days, latency=latency,
+                                   supabase_queries=queries))
+            warm = measure(lambda: dashboard.render_live_view('ETH-USD', days), repeat)
+            results.append(_result('refresh_warm', size, warm, days=days, latency=latency))
+            api.close()
+    return results
+
+
+def _dashboard(supabase, api):
+    from app import LiveCryptoDashboard
+    from data_hub import DataHub
+    _quiet_streamlit()
+    return LiveCryptoDashboard(hub=DataHub(supabase, api))
+
+
+def _quiet_streamlit():
+    """Outside `streamlit run` every element call logs a 'missing ScriptRunContext' warning."""
+    from streamlit import config
+    from streamlit.logger import set_log_level
+    # Parsing the config re-applies its `logger.level`, so parse it before lowering the level.
+    config.get_config_options()
+    set_log_level(logging.ERROR)
+
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    versions = {}
+    for module in ('numpy', 'pandas', 'plotly', 'streamlit', 'sklearn'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': versions
+    }
+
+
+BENCHMARKS = ('get_candles', 'indicators', 'windowing', 'candle_buffer', 'charts', 'refresh')
+
+
+def run_benchmarks(benchmarks=BENCHMARKS, sizes=SIZES, repeat=5, latency=0.02, refresh_days=REFRESH_DAYS):
+    """
+    Runs the selected benchmarks and returns the report (environment + list of results).
+    Parameters:
+    - benchmarks: Names from `BENCHMARKS`.
+    - sizes: Candle counts for the size-dependent benchmarks.
+    - repeat: Timed runs per measurement (after one warm-up run).
+    - latency: Simulated backend latency in seconds for the refresh benchmark.
+    - refresh_days: Dashboard timeframes for the refresh benchmark.
+    """
+    runners = {
+        'get_candles': lambda: bench_get_candles(sizes, repeat),
+        'indicators': lambda: bench_indicators(sizes, repeat),
+        'windowing': lambda: bench_windowing(sizes, repeat),
+        'candle_buffer': lambda: bench_candle_buffer(sizes, repeat),
+        'charts': lambda: bench_charts(sizes, repeat),
+        'refresh': lambda: bench_refresh(refresh_days, repeat, latency)
+    }
+    results = []
+    for name in benchmarks:
+        started = time.perf_counter()
+        results.extend(runners[name]())
+        print(f"{name}: done in {time.perf_counter() - started:.1f}s")
+    return {'environment': _environment(), 'results': results}
+
+
+def compare(report, baseline):
+    """Prints the median of every result next to the baseline's; ratios above 1 are slowdowns."""
+    previous = {(r['name'], r['size']): r for r in baseline['results']}
+    print(f"{'benchmark':<32}{'size':>9}{'median':>12}{'baseline':>12}{'ratio':>8}")
+    for result in report['results']:
+        before = previous.get((result['name'], result['size']))
+        line = f"{result['name']:<32}{result['size']:>9}{result['median'] * 1e3:>10.2f}ms"
+        if before is not None:
+            ratio = result['median'] / before['median'] if before['median'] else float('nan')
+            line += f"{before['median'] * 1e3:>10.2f}ms{ratio:>8.2f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ingest, indicators, windowing, charts and refresh.')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to write the JSON report.')
+    parser.add_argument('--compare', default=None, help='Earlier JSON report to compare against.')
+    parser.add_argument('--only', nargs='*', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--sizes', nargs='*', type=int, default=None, help='Candle counts (default: 1k 10k 100k).')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.02, help='Simulated backend latency in seconds.')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes and fewer repeats.')
+    args = parser.parse_args()
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    repeat = 3 if args.quick and args.repeat == 5 else args.repeat
+    report = run_benchmarks(args.only, sizes, repeat, args.latency)
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    else:
+        compare(report, {'results': []})
+
+
+if __name__ == '__main__':
+    main()
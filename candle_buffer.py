@@ -0,0 +1,179 @@
+"""
+Fixed-capacity, columnar candle storage.
+
+A `CandleBuffer` holds the newest `capacity` candles of one product in arrays allocated once:
+int64 epoch seconds for the time and a float matrix for OHLCV and indicator columns. Appending a
+candle writes into the arrays instead of growing lists of dicts, and readers get NumPy views of
+the newest rows without copying; the inference service reads its model windows this way. A
+DataFrame is only built, as a copy, by `to_frame` or `candles_frame` (which `market_stream` uses
+for the candles it returns).
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+# Same order as the candle frames returned by `CoinbaseAPI.get_candles`.
+OHLCV_COLUMNS = ['low', 'high', 'open', 'close', 'volume']
+
+
+def to_epoch(times):
+    """
+    Converts candle times to int64 epoch seconds.
+    Parameters:
+    - times: Datetime-like values (naive ones are taken as UTC) or numbers already in epoch seconds.
+    Returns:
+    - An int64 NumPy array.
+    """
+    if not hasattr(times, 'dtype'):
+        times = np.asarray(times)
+    # Checked on the dtype: np.asarray of a timezone-aware Series would build an object array.
+    if pd.api.types.is_numeric_dtype(times.dtype):
+        return np.asarray(times, dtype=np.int64)
+    if not pd.api.types.is_datetime64_any_dtype(times.dtype):
+        times = pd.to_datetime(times, utc=True)
+    # The int64 values of aware and naive datetimes are both UTC-based.
+    return pd.DatetimeIndex(times).as_unit('ns').asi8 // 10**9
+
+
+def candles_frame(times, values, columns):
+    """Builds a candle DataFrame (UTC `time` first) from epoch seconds and a value matrix; always copies."""
+    df = pd.DataFrame(np.array(values, copy=True), columns=list(columns))
+    df.insert(0, 'time', pd.to_datetime(np.asarray(times, dtype=np.int64), unit='s', utc=True))
+    return df
+
+
+class CandleBuffer:
+    """
+    Ring buffer of the newest `capacity` candles with preallocated NumPy columns.
+    Every row is stored twice, at its slot and at slot + capacity, so the newest n rows always form
+    one contiguous slice: `window`, `column` and `epochs` return read-only views instead of copies.
+    A view stays valid for the next `capacity - n` appends, after which its oldest rows are
+    overwritten; copy it to keep it longer. The buffer is not synchronized, so a buffer shared
+    between threads is guarded by its owner's lock.
+    """
+
+    def __init__(self, capacity, columns=OHLCV_COLUMNS, dtype=np.float64):
+        """
+        Parameters:
+        - capacity: Number of candles kept; older ones are overwritten.
+        - columns: Names of the value columns (e.g. OHLCV followed by indicators).
+        - dtype: Float dtype of the value columns.
+        """
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self.capacity = capacity
+        self.columns = list(columns)
+        self.positions = {name: i for i, name in enumerate(self.columns)}
+        self.times = np.zeros(2 * capacity, dtype=np.int64)
+        self.values = np.zeros((2 * capacity, len(self.columns)), dtype=dtype)
+        # Rows ever written; the newest one sits at slot (count - 1) % capacity.
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes
+
+    @property
+    def last_time(self):
+        """Epoch seconds of the newest candle, or None when empty."""
+        return int(self.times[self._end() - 1]) if self.count else None
+
+    def _end(self):
+        # Exclusive end of the newest rows in the doubled arrays (the copies at slot + capacity).
+        return (self.count - 1) % self.capacity + self.capacity + 1 if self.count else self.capacity
+
+    def _span(self, n):
+        n = len(self) if n is None else max(0, min(n, len(self)))
+        end = self._end()
+        return end - n, end
+
+    def _row(self, values):
+        if isinstance(values, Mapping):
+            return [values[name] for name in self.columns]
+        return values
+
+    def append(self, time, values):
+        """
+        Adds one candle; a candle with the same time as the newest one replaces it (e.g. a candle
+        that is still filling).
+        Parameters:
+        - time: Candle start in epoch seconds.
+        - values: Values in `columns` order, or a mapping with (at least) every column.
+        Returns:
+        - True if the candle was stored, False if it is older than the newest one.
+        """
+        time = int(time)
+        if self.count:
+            last = self.times[self._end() - 1]
+            if time < last:
+                return False
+            if time > last:
+                self.count += 1
+        else:
+            self.count = 1
+        slot = (self.count - 1) % self.capacity
+        self.times[slot] = self.times[slot + self.capacity] = time
+        self.values[slot] = self.values[slot + self.capacity] = self._row(values)
+        return True
+
+    def extend(self, times, values):
+        """
+        Adds a batch of time-sorted candles with vectorized writes. Rows older than the newest
+        stored candle are skipped and one with the same time replaces it, as in `append`.
+        Parameters:
+        - times: Epoch seconds, ascending and unique.
+        - values: Matrix of shape (len(times), len(columns)).
+        Returns:
+        - The number of rows stored.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=self.values.dtype).reshape(len(times), len(self.columns))
+        if self.count:
+            last = self.times[self._end() - 1]
+            keep = times >= last
+            times, values = times[keep], values[keep]
+            if len(times) and times[0] == last:
+                self.count -= 1
+        stored = len(times)
+        # Only the newest `capacity` rows of a large batch would survive, so only they are written.
+        self.count += max(0, stored - self.capacity)
+        times, values = times[-self.capacity:], values[-self.capacity:]
+        slots = (self.count + np.arange(len(times))) % self.capacity
+        self.times[slots] = times
+        self.times[slots + self.capacity] = times
+        self.values[slots] = values
+        self.values[slots + self.capacity] = values
+        self.count += len(times)
+        return stored
+
+    def extend_frame(self, df, time_column='time'):
+        """Adds the candles of a time-sorted frame that has a time column and every value column."""
+        return self.extend(to_epoch(df[time_column]), df[self.columns].to_numpy(dtype=self.values.dtype))
+
+    def _view(self, array):
+        array.flags.writeable = False
+        return array
+
+    def epochs(self, n=None):
+        """Read-only view of the newest `n` candle times (all stored ones by default) in epoch seconds."""
+        start, end = self._span(n)
+        return self._view(self.times[start:end])
+
+    def window(self, n=None):
+        """Read-only (n, len(columns)) view of the newest `n` rows, oldest first."""
+        start, end = self._span(n)
+        return self._view(self.values[start:end])
+
+    def column(self, name, n=None):
+        """Read-only view of one column over the newest `n` rows."""
+        start, end = self._span(n)
+        return self._view(self.values[start:end, self.positions[name]])
+
+    def to_frame(self, n=None):
+        """The newest `n` rows as a new DataFrame with a UTC `time` column followed by `columns`."""
+        start, end = self._span(n)
+        return candles_frame(self.times[start:end], self.values[start:end], self.columns)
@@ -0,0 +1,226 @@
+"""
+Local columnar candle store.
+
+Candles are kept as Parquet files partitioned by product and UTC date:
+
+    <root>/product_id=BTC-USD/date=2025-01-26/part-<timestamp>-<uuid>.parquet
+
+Columns are typed (`time` as int64 epoch seconds, OHLCV as float32), ingest only ever adds new
+files, and reads push product, date and time predicates down to Arrow so only the matching
+partitions and row groups are decoded.
+
+Usage:
+    python candle_store.py data/candles --products BTC-USD ETH-USD --granularity 900 --start 2024-01-01
+"""
+import argparse
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+CANDLE_SCHEMA = pa.schema([
+    ('time', pa.int64()),
+    ('low', pa.float32()),
+    ('high', pa.float32()),
+    ('open', pa.float32()),
+    ('close', pa.float32()),
+    ('volume', pa.float32()),
+])
+PARTITION_SCHEMA = pa.schema([('product_id', pa.string()), ('date', pa.string())])
+PRICE_COLUMNS = ['low', 'high', 'open', 'close', 'volume']
+
+
+def _to_epoch(value):
+    """Converts a datetime, pandas Timestamp or ISO8601 string to epoch seconds (UTC)."""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return int(timestamp.timestamp())
+
+
+def _epoch_seconds(times):
+    """Converts a column of datetimes (naive UTC or tz-aware) to int64 epoch seconds."""
+    return pd.to_datetime(times, utc=True).dt.as_unit('s').astype('int64').to_numpy()
+
+
+def _date_key(epoch):
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+class CandleStore:
+
+    def __init__(self, root):
+        self.root = root
+        self.partitioning = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+
+    def _dataset(self):
+        return ds.dataset(self.root, format='parquet', partitioning=self.partitioning, schema=self._full_schema())
+
+    def _full_schema(self):
+        return pa.schema(list(CANDLE_SCHEMA) + list(PARTITION_SCHEMA))
+
+    def append(self, product_id, df):
+        """
+        Appends candles for one product as new Parquet files, one per UTC date.
+        Parameters:
+        - product_id: The trading pair (e.g., BTC-USD).
+        - df: A DataFrame with the columns returned by `CoinbaseAPI.get_candles`.
+        Returns:
+        - The number of rows written.
+        """
+        if df.empty:
+            return 0
+        table_df = pd.DataFrame({
+            'time': _epoch_seconds(df['time']),
+            **{column: df[column].to_numpy(dtype='float32') for column in PRICE_COLUMNS}
+        }).drop_duplicates(subset='time', keep='last').sort_values('time')
+        dates = table_df['time'].map(_date_key)
+
+        for date, part in table_df.groupby(dates, sort=True):
+            directory = os.path.join(self.root, f'product_id={product_id}', f'date={date}')
+            os.makedirs(directory, exist_ok=True)
+            name = f'part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet'
+            table = pa.Table.from_pandas(part, schema=CANDLE_SCHEMA, preserve_index=False)
+            # Write under a temporary name so readers never see a half-written file.
+            tmp_path = os.path.join(directory, f'.{name}.tmp')
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, os.path.join(directory, name))
+        return len(table_df)
+
+    def read(self, product_ids=None, start=None, end=None, columns=None):
+        """
+        Reads candles with product and time predicates pushed down to the Parquet scan.
+        Parameters:
+        - product_ids: A trading pair or a list of them; all products when None.
+        - start: Inclusive start time (datetime or ISO8601 string), or None.
+        - end: Inclusive end time (datetime or ISO8601 string), or None.
+        - columns: Candle columns to load besides product_id and time (defaults to OHLCV).
+        Returns:
+        - A DataFrame with product_id, time (UTC datetime) and the requested columns, sorted by
+          product and time and de-duplicated on (product_id, time).
+        """
+        columns = list(columns or PRICE_COLUMNS)
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=['product_id', 'time'] + columns)
+
+        if isinstance(product_ids, str):
+            product_ids = [product_ids]
+        conditions = []
+        if product_ids is not None:
+            conditions.append(ds.field('product_id').isin(list(product_ids)))
+        if start is not None:
+            start_epoch = _to_epoch(start)
+            conditions.append(ds.field('date') >= _date_key(start_epoch))
+            conditions.append(ds.field('time') >= start_epoch)
+        if end is not None:
+            end_epoch = _to_epoch(end)
+            conditions.append(ds.field('date') <= _date_key(end_epoch))
+            conditions.append(ds.field('time') <= end_epoch)
+        predicate = None
+        for condition in conditions:
+            predicate = condition if predicate is None else predicate & condition
+
+        table = self._dataset().to_table(columns=['product_id', 'time'] + columns, filter=predicate)
+        df = table.to_pandas()
+        df = df.drop_duplicates(subset=['product_id', 'time'], keep='last')
+        df = df.sort_values(['product_id', 'time']).reset_index(drop=True)
+        df['time'] = pd.to_datetime(df['time'], unit='s', utc=True)
+        return df
+
+    def last_time(self, product_id):
+        """Returns the newest stored candle time for a product as epoch seconds, or None."""
+        directory = os.path.join(self.root, f'product_id={product_id}')
+        if not os.path.isdir(directory):
+            return None
+        dates = sorted(d for d in os.listdir(directory) if d.startswith('date='))
+        # Only the newest date partition has to be scanned.
+        for date in reversed(dates):
+            dataset = ds.dataset(os.path.join(directory, date), format='parquet', schema=CANDLE_SCHEMA)
+            table = dataset.to_table(columns=['time'])
+            if table.num_rows:
+                return int(pc.max(table['time']).as_py())
+        return None
+
+    def ingest(self, api, product_ids, granularity, start=None, end=None):
+        """
+        Fetches new candles from Coinbase and appends them to the store.
+        Parameters:
+        - api: A `CoinbaseAPI` instance.
+        - product_ids: Trading pairs to ingest.
+        - granularity: Candle size in seconds.
+        - start: Where to start for products without stored candles (datetime or ISO8601 string).
+        - end: End of the range; defaults to now. Capped at the last closed candle, because the
+          next run resumes after the newest stored candle and would never correct one still filling.
+        Returns:
+        - A dict mapping each product_id to the number of rows appended.
+        """
+        last_closed = (int(time.time()) // granularity - 1) * granularity
+        end = datetime.fromtimestamp(min(_to_epoch(end), last_closed) if end else last_closed, tz=timezone.utc)
+        written = {}
+        # Group products by resume point so each group is one concurrent backfill.
+        groups = {}
+        for product_id in product_ids:
+            last = self.last_time(product_id)
+            if last is not None:
+                resume = datetime.fromtimestamp(last + granularity, tz=timezone.utc)
+            elif start is not None:
+                resume = start
+            else:
+                resume = pd.Timestamp(end).to_pydatetime() - timedelta(days=1)
+            groups.setdefault(resume, []).append((product_id, last))
+
+        for resume, members in groups.items():
+            if _to_epoch(resume) > _to_epoch(end):
+                written.update({product_id: 0 for product_id, _ in members})
+                continue
+            frames = api.get_candles_range([product_id for product_id, _ in members], resume, end, granularity)
+            for product_id, last in members:
+                df = frames[product_id]
+                if last is not None and not df.empty:
+                    df = df[_epoch_seconds(df['time']) > last]
+                written[product_id] = self.append(product_id, df)
+        return written
+
+    def compact(self, product_id):
+        """Rewrites each date partition of a product as a single de-duplicated file."""
+        directory = os.path.join(self.root, f'product_id={product_id}')
+        if not os.path.isdir(directory):
+            return
+        for date in os.listdir(directory):
+            partition = os.path.join(directory, date)
+            parts = [f for f in os.listdir(partition) if f.endswith('.parquet')]
+            if len(parts) < 2:
+                continue
+            table = ds.dataset(partition, format='parquet', schema=CANDLE_SCHEMA).to_table()
+            df = table.to_pandas().drop_duplicates(subset='time', keep='last').sort_values('time')
+            name = f'part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet'
+            tmp_path = os.path.join(partition, f'.{name}.tmp')
+            pq.write_table(pa.Table.from_pandas(df, schema=CANDLE_SCHEMA, preserve_index=False), tmp_path, compression='zstd')
+            os.replace(tmp_path, os.path.join(partition, name))
+            for part in parts:
+                os.remove(os.path.join(partition, part))
+
+
+def main():
+    from data_fetcher import CoinbaseAPI
+
+    parser = argparse.ArgumentParser(description='Append new Coinbase candles to the local candle store.')
+    parser.add_argument('root')
+    parser.add_argument('--products', nargs='+', required=True)
+    parser.add_argument('--granularity', type=int, default=900)
+    parser.add_argument('--start', default=None, help='Start for products that have no stored candles yet.')
+    args = parser.parse_args()
+
+    written = CandleStore(args.root).ingest(CoinbaseAPI(), args.products, args.granularity, start=args.start)
+    for product_id, rows in written.items():
+        print(f'{product_id}: {rows} rows appended')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,174 @@
 import requests
 import pandas as pd 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import itertools
+import random
+import threading
 import time 
-from datetime import datetime, timedelta
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from metrics import REGISTRY
+
+MAX_CANDLES_PER_REQUEST = 300
+
+COINBASE_REQUESTS = REGISTRY.counter('coinbase_requests_total', 'Coinbase REST responses by endpoint and HTTP status.')
+COINBASE_SECONDS = REGISTRY.histogram('coinbase_request_seconds', 'Coinbase REST latency by endpoint, without rate-limiter waits.')
+COINBASE_BYTES = REGISTRY.counter('coinbase_response_bytes_total', 'Response bytes received from Coinbase by endpoint.')
+RATE_LIMITER_WAIT = REGISTRY.histogram('rate_limiter_wait_seconds', 'Time callers waited for a rate-limiter token.')
+RATE_LIMITER_BACKOFFS = REGISTRY.counter('rate_limiter_backoffs_total', 'HTTP 429 responses that slowed the rate limiter down.')
+RATE_LIMITER_RATE = REGISTRY.gauge('rate_limiter_rate', 'Current refill rate of each rate limiter in requests per second.')
+_LIMITER_IDS = itertools.count(1)
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+    Tokens refill continuously at `rate` per second up to `capacity`, so short bursts of up to
+    `capacity` requests go out immediately and sustained traffic is held at `rate`.
+    On HTTP 429 the refill rate is halved and every caller is paused for the Retry-After delay
+    (plus jitter); each successful request then restores `recovery` of the nominal rate.
+    The current rate is reported as `rate_limiter_rate{limiter=name}`.
+    """
+
+    def __init__(self, rate=10, capacity=15, min_rate=1, recovery=0.1, name=None):
+        self.nominal_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.min_rate = float(min_rate)
+        self.recovery = recovery
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+        self.requests = 0
+        self.throttled = 0
+        self.backoffs = 0
+        self.total_wait = 0.0
+
+        self.name = name or f'limiter-{next(_LIMITER_IDS)}'
+        # A weak reference, so the gauge does not keep a discarded limiter alive; its series is
+        # dropped when the limiter is collected.
+        ref = weakref.ref(self)
+        RATE_LIMITER_RATE.set_function(lambda: ref().rate, limiter=self.name)
+        weakref.finalize(self, RATE_LIMITER_RATE.remove, limiter=self.name)
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def acquire(self):
+        """
+        Takes one token, sleeping until it is available.
+        Tokens are reserved under the lock and the sleep happens outside it, so waiting
+        callers queue up in order without blocking each other.
+        Returns:
+        - The number of seconds the caller waited.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait_time = max(0.0, -self.tokens / self.rate, self.paused_until - now)
+            self.requests += 1
+            if wait_time > 0:
+                self.throttled += 1
+                self.total_wait += wait_time
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+    def backoff(self, retry_after=None, attempt=0, base_delay=1.0, max_delay=60.0):
+        """
+        Slows the limiter down after the server answered with HTTP 429.
+        Parameters:
+        - retry_after: Delay in seconds requested by the server, if any.
+        - attempt: Zero-based retry attempt, used for exponential backoff without Retry-After.
+        - base_delay: Backoff delay for the first attempt when no Retry-After is given.
+        - max_delay: Upper bound for the delay.
+        Returns:
+        - The pause in seconds applied to all callers.
+        """
+        delay = retry_after if retry_after is not None else base_delay * (2 ** attempt)
+        delay = min(max_delay, delay) + random.uniform(0, 0.25 * min(max_delay, delay) + 0.05)
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.paused_until:
+                # Concurrent 429s from the same burst only slow the bucket down once.
+                self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            self.paused_until = max(self.paused_until, now + delay)
+            self.backoffs += 1
+        return delay
+
+    def record_success(self):
+        """Recovers the refill rate additively after a backoff."""
+        if self.rate < self.nominal_rate:
+            with self.lock:
+                self.rate = min(self.nominal_rate, self.rate + self.recovery * self.nominal_rate)
+
+    def stats(self):
+        """Returns a snapshot of the limiter counters."""
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'backoffs': self.backoffs,
+                'total_wait': self.total_wait,
+                'current_rate': self.rate,
+            }
+
 
 class CoinbaseAPI:
 
-    def __init__(self, base_url="https://api.exchange.coinbase.com", rate_limit=10):
+    def __init__(self, base_url="https://api.exchange.coinbase.com", rate_limit=10, burst=15,
+                 max_workers=8, max_retries=3, limiter=None, pool_size=None, timeout=(3.05, 10),
+                 connection_retries=3, retry_backoff=0.5):
         self.base_url = base_url
         self.rate_limit = rate_limit 
-        self.last_request_time = None 
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = limiter or TokenBucket(rate=rate_limit, capacity=burst)
+        self.session = self.create_session(pool_size or max(10, max_workers), connection_retries, retry_backoff)
+
+    @staticmethod
+    def create_session(pool_size=10, connection_retries=3, retry_backoff=0.5):
+        """
+        Creates the pooled HTTP session shared by every endpoint method and worker thread.
+        Parameters:
+        - pool_size: Maximum number of keep-alive connections kept open per host.
+        - connection_retries: Retries for connection errors and 5xx responses.
+        - retry_backoff: Backoff factor between those retries (0.5 -> 0.5s, 1s, 2s, ...).
+        Note:
+        - HTTP 429 is left to the token bucket, which pauses every caller instead of just one.
+        - The session only carries the connection pool (no cookies or auth), and urllib3 pools
+          are thread-safe, so one session can serve all threads in `get_candles_range`.
+        """
+        retry = Retry(
+            total=connection_retries,
+            backoff_factor=retry_backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Accept': 'application/json', 'Connection': 'keep-alive'})
+        return session
+
+    def close(self):
+        """Closes the pooled connections held by the session."""
+        self.session.close()
 
     def rate_limiter(self):
         """
@@ -16,14 +176,41 @@ class CoinbaseAPI:
         Note:
         - The API returns a maximum of 300 candles per request. 
         - Granularity is set to 900 seconds (15 minutes)
-        - To avoid overloading the server and stay within the rate limits, a delay is introduced between requests.
+        - All endpoint methods and worker threads share one token bucket, so bursts are allowed
+          up to `burst` requests while the sustained rate stays at `rate_limit` requests per second.
         """
-        if self.last_request_time:
-            elapsed_time = time.time() - self.last_request_time
-            wait_time = max(0, 1 / self.rate_limit - elapsed_time)
-            if wait_time > 0:
-                time.sleep(wait_time)
-        self.last_request_time = None 
+        return self.limiter.acquire()
+
+    def _get(self, path, params=None):
+        """
+        Sends a rate-limited GET request, retrying with backoff when the API answers HTTP 429.
+        Parameters:
+        - path: Endpoint path relative to `base_url` (e.g., /products).
+        - params: Optional query parameters.
+        Returns:
+        - The final response object; callers check the status code.
+        """
+        url = f'{self.base_url}{path}'
+        endpoint = path.rstrip('/').rsplit('/', 1)[-1]
+        for attempt in range(self.max_retries + 1):
+            RATE_LIMITER_WAIT.observe(self.rate_limiter())
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except Exception:
+                COINBASE_REQUESTS.inc(endpoint=endpoint, status='error')
+                raise
+            finally:
+                COINBASE_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+            COINBASE_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+            COINBASE_BYTES.inc(len(response.content), endpoint=endpoint)
+            if response.status_code != 429:
+                self.limiter.record_success()
+                return response
+            if attempt < self.max_retries:
+                RATE_LIMITER_BACKOFFS.inc()
+                self.limiter.backoff(_retry_after_seconds(response), attempt)
+        return response
 
     def get_products(self):
         """
@@ -33,10 +220,7 @@ class CoinbaseAPI:
         Raises:
         - Exception if the API request fails.
         """
-        self.rate_limiter() 
-
-        url = f'{self.base_url}/products'
-        response = requests.get(url)
+        response = self._get('/products')
         if response.status_code == 200:
             return pd.DataFrame(response.json())
         
@@ -54,10 +238,7 @@ class CoinbaseAPI:
         Raises:
         - Exception if the API request fails.
         """
-        self.rate_limiter()
-
-        url = f'{self.base_url}/products/{product_id}/ticker'
-        response = requests.get(url)
+        response = self._get(f'/products/{product_id}/ticker')
         if response.status_code == 200:
             return response.json()
         else:
@@ -76,15 +257,12 @@ class CoinbaseAPI:
         Raises:
         - Exception if the API request fails.
         """
-        self.rate_limiter()
-
-        url = f'{self.base_url}/products/{product_id}/candles'
         params = {
             'start': start,
             'end': end, 
             'granularity': granularity
         }
-        response = requests.get(url, params=params)
+        response = self._get(f'/products/{product_id}/candles', params=params)
         if response.status_code == 200:
             colums = ['time', 'low', 'high', 'open', 'close', 'volume']
             data = response.json()
@@ -105,10 +283,116 @@ class CoinbaseAPI:
         Raises:
         - Exception if the API request fails.
         """
-        url = f'{self.base_url}/products/{product_id}/stats'
-        response = requests.get(url)
+        response = self._get(f'/products/{product_id}/stats')
         if response.status_code == 200:
             return response.json()
         
         else:
-            raise Exception(f"Error fetching stats for {product_id}: {response.status_code}, {response.text}")
\ No newline at end of file
+            raise Exception(f"Error fetching stats for {product_id}: {response.status_code}, {response.text}")
+
+    def get_candles_range(self, product_ids, start, end, granularity, max_workers=None):
+        """
+        Backfills candlestick data for one or more products over an arbitrary time range.
+        The range is split into windows of at most 300 candles (the API limit per request)
+        and the windows are fetched concurrently on a bounded worker pool. Every request
+        still goes through `get_candles`, so the rate limiter applies to each window.
+        Parameters:
+        - product_ids: A trading pair (e.g., BTC-USD) or a list of trading pairs.
+        - start: Start time for the data (datetime or ISO8601 string).
+        - end: End time for the data (datetime or ISO8601 string).
+        - granularity: Time interval between data points in seconds (e.g., 60, 300, 900).
+        - max_workers: Number of concurrent requests (defaults to `self.max_workers`).
+        Returns:
+        - A dict mapping each product_id to a DataFrame sorted by time and de-duplicated,
+          with the same columns as `get_candles`.
+        Raises:
+        - Exception if any window could not be fetched.
+        """
+        if isinstance(product_ids, str):
+            product_ids = [product_ids]
+        windows = self.split_candle_windows(start, end, granularity)
+
+        tasks = [(product_id, window_start, window_end)
+                 for product_id in product_ids
+                 for window_start, window_end in windows]
+        frames = {product_id: [] for product_id in product_ids}
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            futures = {
+                executor.submit(self.get_candles, product_id, window_start.isoformat(), window_end.isoformat(), granularity): product_id
+                for product_id, window_start, window_end in tasks
+            }
+            for future in as_completed(futures):
+                product_id = futures[future]
+                try:
+                    frames[product_id].append(future.result())
+                except Exception as e:
+                    errors.append(f'{product_id}: {e}')
+
+        if errors:
+            raise Exception(f'Error backfilling candles for {len(errors)} of {len(tasks)} windows: {errors[0]}')
+
+        start_ts = pd.Timestamp(windows[0][0]).tz_convert(None) if windows else None
+        end_ts = pd.Timestamp(windows[-1][1]).tz_convert(None) if windows else None
+        results = {}
+        for product_id, product_frames in frames.items():
+            if not product_frames:
+                results[product_id] = pd.DataFrame(columns=['time', 'low', 'high', 'open', 'close', 'volume'])
+                continue
+            df = pd.concat(product_frames, ignore_index=True)
+            df = df[(df['time'] >= start_ts) & (df['time'] <= end_ts)]
+            df = df.drop_duplicates(subset='time', keep='last').sort_values('time')
+            results[product_id] = df.reset_index(drop=True)
+        return results
+
+    @staticmethod
+    def split_candle_windows(start, end, granularity, max_candles=MAX_CANDLES_PER_REQUEST):
+        """
+        Splits a time range into consecutive windows that each hold at most `max_candles` candles.
+        Parameters:
+        - start: Start time (datetime or ISO8601 string).
+        - end: End time (datetime or ISO8601 string).
+        - granularity: Candle size in seconds.
+        - max_candles: Maximum candles the API returns per request.
+        Returns:
+        - A list of (window_start, window_end) UTC datetimes; both bounds are inclusive.
+        """
+        start = _to_utc_datetime(start)
+        end = _to_utc_datetime(end)
+        step = timedelta(seconds=granularity * max_candles)
+        last_offset = timedelta(seconds=granularity * (max_candles - 1))
+
+        windows = []
+        window_start = start
+        while window_start <= end:
+            windows.append((window_start, min(window_start + last_offset, end)))
+            window_start += step
+        return windows
+
+
+def _to_utc_datetime(value):
+    """Parses a datetime or ISO8601 string into a timezone-aware UTC datetime."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _retry_after_seconds(response):
+    """Reads the Retry-After header (seconds or HTTP date) from a response, if present."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,311 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from downsampling import lttb
+from history_cache import HistoryCache, execute_query
+from indicators import DASHBOARD_INDICATORS, compute_indicators
+from market_stream import CoinbaseMarketStream
+from metrics import REGISTRY
+from reference_prices import ReferencePriceIndex
+
+TICKER_MAX_AGE = 10
+HISTORY_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+PREDICTION_COLUMNS = ['prediction_date', 'predicted_price']
+SPARKLINE_POINTS = 48
+
+CACHE_REQUESTS = REGISTRY.counter(
+    'hub_cache_requests_total', 'Data hub cache lookups by kind and result (hit, miss or shared in-flight load).'
+)
+HUB_LOAD_SECONDS = REGISTRY.histogram('hub_load_seconds', 'Time to serve one dashboard data source, cache hits included.')
+INDICATOR_SECONDS = REGISTRY.histogram('indicator_seconds', 'Dashboard indicator computation time.')
+POLL_ERRORS = REGISTRY.counter('hub_poll_errors_total', 'Background refreshes that failed, by product.')
+
+
+class TTLCache:
+    """
+    Thread-safe memoizer with per-key expiry.
+    Concurrent requests for a key that is being loaded wait for that single load instead of
+    starting their own, so N callers asking for the same thing cost one backend call.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_loads = 0
+
+    def get(self, key, loader, ttl, refresh=False):
+        """
+        Returns the cached value for `key`, calling `loader()` when it is missing or expired.
+        Parameters:
+        - key: Hashable cache key.
+        - loader: Zero-argument callable producing the value.
+        - ttl: Seconds the loaded value stays fresh.
+        - refresh: Reload even if the cached value is still fresh.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            kind = key[0] if isinstance(key, tuple) else key
+            if entry is not None and not refresh and entry[0] > time.monotonic():
+                self.hits += 1
+                CACHE_REQUESTS.inc(kind=kind, result='hit')
+                return entry[1]
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[key] = future
+                self.misses += 1
+                CACHE_REQUESTS.inc(kind=kind, result='miss')
+            else:
+                self.shared_loads += 1
+                CACHE_REQUESTS.inc(kind=kind, result='shared')
+
+        if not owner:
+            return future.result()
+        try:
+            value = loader()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            with self.lock:
+                self.entries[key] = (time.monotonic() + ttl, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class DataHub:
+    """
+    Process-wide data layer shared by every dashboard session.
+    Owns the single Supabase client, Coinbase client, WebSocket feed and caches. Sessions
+    `subscribe` to a (product, timeframe) and read from the cache; one background poller per
+    product keeps the subscribed entries fresh, so backend load grows with the number of distinct
+    pairs being watched rather than with the number of viewers.
+    Frames returned by the hub are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, supabase, api, candle_store=None, poll_interval=60, ticker_ttl=5,
+                 products_ttl=3600, idle_timeout=300, load_workers=16):
+        self.supabase = supabase
+        self.api = api
+        self.candle_store = candle_store
+        self.poll_interval = poll_interval
+        self.ticker_ttl = ticker_ttl
+        self.products_ttl = products_ttl
+        self.idle_timeout = idle_timeout
+        # Entries stay valid a little longer than a poll cycle so readers never block on a poller.
+        self.data_ttl = poll_interval * 1.5
+
+        self.cache = TTLCache()
+        self.history_cache = HistoryCache(supabase, 'coinbase_data', 'time', HISTORY_COLUMNS)
+        # Predictions run ahead of the clock, so their window has no upper bound.
+        self.prediction_cache = HistoryCache(
+            supabase, 'coinbase_predictions', 'prediction_date', PREDICTION_COLUMNS, bounded_end=False
+        )
+        self.reference_prices = ReferencePriceIndex(supabase)
+        self.stream = None
+
+        self.subscriptions = {}
+        self.pollers = {}
+        self.lock = threading.Lock()
+        # Shared by all sessions; loads of the same key are de-duplicated by the cache, so waiting
+        # workers never hold up the one doing the load.
+        self.executor = ThreadPoolExecutor(max_workers=load_workers, thread_name_prefix='data-hub-load')
+
+    def start_stream(self, product_ids):
+        """Starts the shared WebSocket feed once for the given products."""
+        with self.lock:
+            if self.stream is None and product_ids:
+                self.stream = CoinbaseMarketStream(product_ids).start()
+        return self.stream
+
+    def get_products(self):
+        """Product ids from the `crypto_products` table."""
+        def load():
+            query = execute_query(self.supabase.table('crypto_products').select('product_id'), 'crypto_products')
+            return [item['product_id'] for item in query.data] if query.data else []
+        return self.cache.get(('products',), load, self.products_ttl)
+
+    def calculate_indicators(self, df):
+        """Attaches the dashboard indicators to a candle frame."""
+        with INDICATOR_SECONDS.time():
+            return compute_indicators(df, DASHBOARD_INDICATORS)
+
+    def _load_history(self, product_id, days):
+        if self.candle_store is not None:
+            end_time = datetime.now(timezone.utc)
+            df = self.candle_store.read(product_id, end_time - timedelta(days=days), end_time)
+            df = df.drop(columns='product_id')
+        else:
+            df = self.history_cache.get(product_id, days)
+        return self.calculate_indicators(df)
+
+    def get_history(self, product_id, days, refresh=False):
+        """Candles of the last `days` days with the dashboard indicators attached."""
+        return self.cache.get(
+            ('history', product_id, days), lambda: self._load_history(product_id, days), self.data_ttl, refresh
+        )
+
+    def get_predictions(self, product_id, days, refresh=False):
+        """Predictions from the last `days` days onwards."""
+        return self.cache.get(
+            ('predictions', product_id, days), lambda: self.prediction_cache.get(product_id, days), self.data_ttl, refresh
+        )
+
+    def get_ticker(self, product_id, refresh=False):
+        """Latest ticker from the WebSocket feed, falling back to a cached REST ticker when it is stale."""
+        if self.stream is not None:
+            ticker = self.stream.get_ticker(product_id, max_age=TICKER_MAX_AGE)
+            if ticker is not None:
+                return ticker
+
+        def load():
+            ticker = self.api.get_ticker(product_id)
+            return {
+                'price': float(ticker['price']),
+                'volume': float(ticker['volume']),
+                'bid': float(ticker['bid']),
+                'ask': float(ticker['ask']),
+                'time': datetime.fromisoformat(ticker['time'].replace('Z', '+00:00'))
+            }
+        return self.cache.get(('ticker', product_id), load, self.ticker_ttl, refresh)
+
+    def get_reference_prices(self, product_id, lookbacks=(365, 30)):
+        """Reference closes for the given lookbacks in days; see `ReferencePriceIndex`."""
+        lookbacks = tuple(lookbacks)
+        return self.cache.get(
+            ('reference', product_id, lookbacks),
+            lambda: self.reference_prices.get(product_id, lookbacks),
+            self.data_ttl
+        )
+
+    def _load_overview(self, product_ids, days):
+        if self.candle_store is not None:
+            end_time = datetime.now(timezone.utc)
+            candles = self.candle_store.read(product_ids, end_time - timedelta(days=days), end_time)
+            histories = {product_id: group.drop(columns='product_id') for product_id, group in candles.groupby('product_id')}
+        else:
+            histories = self.history_cache.get_many(product_ids, days)
+        predictions = self.prediction_cache.get_many(product_ids, days)
+        references = self.reference_prices.get_many(product_ids, (7, 30))
+        tickers = self.stream.snapshot() if self.stream is not None else {}
+        now = time.time()
+
+        rows = []
+        for product_id in product_ids:
+            history = histories.get(product_id)
+            if history is None or history.empty:
+                continue
+            history = compute_indicators(history.reset_index(drop=True), DASHBOARD_INDICATORS)
+            latest = history.iloc[-1]
+            ticker = tickers.get(product_id)
+            fresh = ticker is not None and now - ticker['received_at'] <= TICKER_MAX_AGE
+            # The shared feed covers every pair; the latest close stands in when it is stale.
+            price = ticker['price'] if fresh else float(latest['close'])
+            first_close = float(history['close'].iloc[0])
+            reference = references[product_id]
+            prediction = predictions.get(product_id)
+            predicted = prediction.iloc[-1] if prediction is not None and not prediction.empty else None
+            rows.append({
+                'product_id': product_id,
+                'price': price,
+                'change_24h': (price - first_close) / first_close * 100 if first_close else None,
+                'change_7d': (price - reference[7]) / reference[7] * 100 if reference[7] else None,
+                'change_30d': (price - reference[30]) / reference[30] * 100 if reference[30] else None,
+                'sma_deviation': (price - latest['SMA20']) / latest['SMA20'] * 100,
+                'ema_deviation': (price - latest['EMA20']) / latest['EMA20'] * 100,
+                'sparkline': lttb(history, 'time', 'close', SPARKLINE_POINTS)['close'].tolist(),
+                'predicted_price': float(predicted['predicted_price']) if predicted is not None else None,
+                'prediction_date': predicted['prediction_date'] if predicted is not None else None,
+                'updated': latest['time']
+            })
+        return pd.DataFrame(rows)
+
+    def get_overview(self, product_ids, days=1):
+        """
+        One row per product for the market overview: price, 24h/7d/30d change, deviation from
+        SMA20/EMA20, a close-price sparkline and the latest prediction.
+        History and predictions are each loaded for all products with one batched query, and the
+        7d/30d references come from the once-a-day reference index.
+        """
+        product_ids = tuple(sorted(product_ids))
+        with HUB_LOAD_SECONDS.time(source='overview'):
+            return self.cache.get(
+                ('overview', product_ids, days), lambda: self._load_overview(product_ids, days), self.data_ttl
+            )
+
+    def _timed(self, source, getter, *args):
+        with HUB_LOAD_SECONDS.time(source=source):
+            return getter(*args)
+
+    def snapshot_futures(self, product_id, days):
+        """
+        Starts every load one dashboard view needs for a (product, timeframe) concurrently.
+        Returns:
+        - A dict mapping history, predictions, ticker and reference_prices to futures, so callers
+          can render each panel as soon as its data arrives.
+        """
+        self.subscribe(product_id, days)
+        return {
+            'history': self.executor.submit(self._timed, 'history', self.get_history, product_id, days),
+            'predictions': self.executor.submit(self._timed, 'predictions', self.get_predictions, product_id, days),
+            'ticker': self.executor.submit(self._timed, 'ticker', self.get_ticker, product_id),
+            'reference_prices': self.executor.submit(self._timed, 'reference_prices', self.get_reference_prices, product_id)
+        }
+
+    def snapshot(self, product_id, days):
+        """Everything one dashboard view needs for a (product, timeframe); the loads run concurrently."""
+        return {name: future.result() for name, future in self.snapshot_futures(product_id, days).items()}
+
+    def subscribe(self, product_id, days):
+        """Registers interest in a (product, timeframe) and starts the product's poller if needed."""
+        with self.lock:
+            self.subscriptions[(product_id, days)] = time.monotonic()
+            poller = self.pollers.get(product_id)
+            if poller is None or not poller.is_alive():
+                poller = threading.Thread(
+                    target=self._poll, args=(product_id,), name=f'data-hub-{product_id}', daemon=True
+                )
+                self.pollers[product_id] = poller
+                poller.start()
+
+    def _active_timeframes(self, product_id):
+        now = time.monotonic()
+        with self.lock:
+            for key, last_seen in list(self.subscriptions.items()):
+                if now - last_seen > self.idle_timeout:
+                    del self.subscriptions[key]
+            return [days for (product, days) in self.subscriptions if product == product_id]
+
+    def _poll(self, product_id):
+        while True:
+            time.sleep(self.poll_interval)
+            timeframes = self._active_timeframes(product_id)
+            if not timeframes:
+                with self.lock:
+                    # Re-check under the lock so a concurrent subscribe is not lost.
+                    if not any(product == product_id for product, _ in self.subscriptions):
+                        self.pollers.pop(product_id, None)
+                        return
+                continue
+            for days in timeframes:
+                try:
+                    self.get_history(product_id, days, refresh=True)
+                    self.get_predictions(product_id, days, refresh=True)
+                except Exception as e:
+                    POLL_ERRORS.inc(product_id=product_id)
+                    print(f"Error refreshing {product_id} ({days}d): {e}")
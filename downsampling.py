@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Candle sizes the chart may switch to, finest first.
+CHART_RESOLUTIONS = ['15min', '1h', '4h', '1D']
+MAX_CHART_CANDLES = 500
+MAX_LINE_POINTS = 800
+
+
+def choose_resolution(times, max_candles=MAX_CHART_CANDLES, resolutions=CHART_RESOLUTIONS):
+    """
+    Picks the finest candle size that keeps the chart at or below `max_candles` candles.
+    Parameters:
+    - times: Candle times (datetime-like).
+    - max_candles: Upper bound on the number of candles drawn (roughly one per couple of pixels).
+    - resolutions: Candidate pandas offset aliases, finest first.
+    Returns:
+    - An offset alias such as '1h', or None when the data is already small enough.
+    """
+    if len(times) <= max_candles:
+        return None
+    times = pd.to_datetime(times)
+    span = times.max() - times.min()
+    for resolution in resolutions:
+        if span / pd.Timedelta(resolution) < max_candles:
+            return resolution
+    return resolutions[-1]
+
+
+def resample_ohlcv(df, resolution, time_column='time'):
+    """
+    Aggregates candles into `resolution` buckets (open first, high max, low min, close last,
+    volume sum). Buckets without candles are dropped, so gaps stay gaps.
+    """
+    return (
+        df.resample(resolution, on=time_column, label='left', closed='left')
+        .agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+        .dropna(subset=['close'])
+        .reset_index()
+    )
+
+
+def downsample_ohlcv(df, max_candles=MAX_CHART_CANDLES, time_column='time'):
+    """Resamples candles to the resolution chosen by `choose_resolution`; returns `df` unchanged if none is needed."""
+    resolution = choose_resolution(df[time_column], max_candles)
+    if resolution is None:
+        return df
+    return resample_ohlcv(df, resolution, time_column)
+
+
+def lttb_indices(x, y, n_out=MAX_LINE_POINTS):
+    """
+    Largest-Triangle-Three-Buckets decimation.
+    Keeps the first and last point and, from each of `n_out - 2` equal buckets in between, the point
+    forming the largest triangle with the previously kept point and the mean of the next bucket.
+    Peaks and troughs survive, unlike plain striding.
+    Parameters:
+    - x: Monotonic x values (numeric or datetime-like).
+    - y: Values aligned with `x`.
+    - n_out: Number of points to keep.
+    Returns:
+    - Sorted integer positions of the kept points (all positions when len(y) <= n_out).
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    if np.issubdtype(np.asarray(x).dtype, np.number):
+        x = np.asarray(x, dtype=np.float64)
+    else:
+        x = pd.DatetimeIndex(x).as_unit('ns').asi8.astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 1 edges split the points between the first and the last into n_out - 2 buckets.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    # Mean of every bucket up front; the bucket after the last one is the final point itself.
+    mean_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes, x[-1])
+    mean_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes, y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - mean_x[i + 1]) * (y[start:end] - ay) - (ax - x[start:end]) * (mean_y[i + 1] - ay))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def lttb(df, x_column, y_column, n_out=MAX_LINE_POINTS):
+    """Returns the rows of `df` that LTTB keeps for the line `y_column` over `x_column`."""
+    if len(df) <= n_out:
+        return df
+    return df.iloc[lttb_indices(df[x_column], df[y_column], n_out)]
+
+
+def candle_colors(df, up='green', down='red'):
+    """Per-candle colors for volume bars, without a Python loop."""
+    return np.where(df['close'].to_numpy() < df['open'].to_numpy(), down, up)
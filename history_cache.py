@@ -0,0 +1,159 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from metrics import REGISTRY
+
+SUPABASE_QUERIES = REGISTRY.counter('supabase_queries_total', 'Supabase queries by table and outcome.')
+SUPABASE_SECONDS = REGISTRY.histogram('supabase_query_seconds', 'Supabase query latency by table.')
+SUPABASE_ROWS = REGISTRY.counter('supabase_rows_total', 'Rows returned by (or inserted into) Supabase by table.')
+HISTORY_LOADS = REGISTRY.counter('history_cache_loads_total', 'History cache loads by table and mode (full window or delta).')
+
+
+def execute_query(query, table):
+    """Executes a Supabase query, recording its latency, outcome and row count."""
+    started = time.perf_counter()
+    try:
+        response = query.execute()
+    except Exception:
+        SUPABASE_QUERIES.inc(table=table, outcome='error')
+        raise
+    finally:
+        SUPABASE_SECONDS.observe(time.perf_counter() - started, table=table)
+    SUPABASE_QUERIES.inc(table=table, outcome='ok')
+    SUPABASE_ROWS.inc(len(response.data or []), table=table)
+    return response
+
+
+class HistoryCache:
+    """
+    Client-side cache of time-windowed Supabase queries, one frame per (product, timeframe).
+    The first request for a key loads the whole window; later requests only ask for rows at or
+    after the newest cached timestamp, merge them in and drop rows that fell out of the window.
+    """
+
+    def __init__(self, supabase, table, time_column, columns, bounded_end=True, page_size=1000):
+        self.supabase = supabase
+        self.table = table
+        self.time_column = time_column
+        self.columns = list(columns)
+        self.bounded_end = bounded_end
+        self.page_size = page_size
+        self.frames = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self.lock:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def _query(self, product_id, start_time, end_time):
+        """Loads the rows of one product, or of a list of products with one paged `in_` query."""
+        batched = not isinstance(product_id, str)
+        columns = ['product_id'] + self.columns if batched else self.columns
+        rows = []
+        offset = 0
+        while True:
+            query = self.supabase.table(self.table).select(','.join(columns))
+            query = query.in_('product_id', list(product_id)) if batched else query.eq('product_id', product_id)
+            query = query.gte(self.time_column, start_time.isoformat())
+            if self.bounded_end:
+                query = query.lte(self.time_column, end_time.isoformat())
+            query = query.order(self.time_column)
+            if batched:
+                # Pages need a total order; timestamps repeat across products.
+                query = query.order('product_id')
+            page = execute_query(query.range(offset, offset + self.page_size - 1), self.table)
+            rows.extend(page.data or [])
+            if len(page.data or []) < self.page_size:
+                break
+            offset += self.page_size
+
+        df = pd.DataFrame(rows, columns=columns)
+        df[self.time_column] = pd.to_datetime(df[self.time_column], utc=True)
+        return df
+
+    def _merge(self, key, cached, delta, start_time):
+        if cached is None or cached.empty:
+            df = delta
+        else:
+            df = pd.concat([cached, delta], ignore_index=True) if not delta.empty else cached
+            df = df.drop_duplicates(subset=self.time_column, keep='last')
+        df = df[df[self.time_column] >= start_time].sort_values(self.time_column).reset_index(drop=True)
+        self.frames[key] = df
+        return df
+
+    def get(self, product_id, days):
+        """
+        Returns the rows of the last `days` days for a product.
+        Parameters:
+        - product_id: The trading pair (e.g., BTC-USD).
+        - days: Size of the window in days.
+        Returns:
+        - A DataFrame with the configured columns, sorted by time. The caller owns the copy.
+        """
+        key = (product_id, days)
+        with self._key_lock(key):
+            end_time = datetime.now(timezone.utc)
+            start_time = end_time - timedelta(days=days)
+            cached = self.frames.get(key)
+
+            if cached is None or cached.empty:
+                HISTORY_LOADS.inc(table=self.table, mode='full')
+                delta = self._query(product_id, start_time, end_time)
+            else:
+                HISTORY_LOADS.inc(table=self.table, mode='delta')
+                # Re-read the newest cached row too, in case it was still being written.
+                delta = self._query(product_id, cached[self.time_column].iloc[-1], end_time)
+            return self._merge(key, cached, delta, start_time).copy()
+
+    def get_many(self, product_ids, days):
+        """
+        Returns the rows of the last `days` days for several products with one query.
+        Products already cached for `days` are only asked for rows at or after the oldest of their
+        newest cached timestamps; the merged frames also serve later `get` calls.
+        Parameters:
+        - product_ids: Trading pairs to load.
+        - days: Size of the window in days.
+        Returns:
+        - A dict mapping each product_id to a time-sorted DataFrame (the caller owns the copies).
+        """
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return {}
+        keys = [(product_id, days) for product_id in product_ids]
+        # Always acquired in sorted order, so concurrent batches cannot deadlock.
+        locks = [self._key_lock(key) for key in keys]
+        for lock in locks:
+            lock.acquire()
+        try:
+            end_time = datetime.now(timezone.utc)
+            start_time = end_time - timedelta(days=days)
+            cached = {key: self.frames.get(key) for key in keys}
+            if any(frame is None or frame.empty for frame in cached.values()):
+                HISTORY_LOADS.inc(table=self.table, mode='full')
+                since = start_time
+            else:
+                HISTORY_LOADS.inc(table=self.table, mode='delta')
+                since = min(frame[self.time_column].iloc[-1] for frame in cached.values())
+
+            delta = self._query(product_ids, since, end_time)
+            groups = dict(tuple(delta.groupby('product_id', sort=False)))
+            empty = delta.iloc[0:0]
+            frames = {}
+            for product_id, key in zip(product_ids, keys):
+                rows = groups.get(product_id, empty).drop(columns='product_id')
+                frames[product_id] = self._merge(key, cached[key], rows, start_time).copy()
+            return frames
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def invalidate(self, product_id=None):
+        """Drops cached frames for one product, or for every product when none is given."""
+        with self.lock:
+            for key in list(self.frames):
+                if product_id is None or key[0] == product_id:
+                    del self.frames[key]
@@ -0,0 +1,374 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+def _rolling_batch(indicator, values, statistic):
+    """
+    Runs a pandas rolling `statistic` over the indicator's buffered values followed by `values`,
+    then re-seeds the indicator from the last `window` values so `update` continues from there.
+    """
+    values = np.asarray(values, dtype=float)
+    series = np.concatenate([np.asarray(indicator.values, dtype=float), values])
+    result = getattr(pd.Series(series).rolling(indicator.window), statistic)().to_numpy()
+    indicator.reset()
+    for value in series[-indicator.window:]:
+        indicator.update(value)
+    return result[len(series) - len(values):]
+
+
+class RollingMean:
+    """
+    O(1) simple moving average over a ring buffer.
+    Uses the same compensated add/remove arithmetic as pandas `rolling(window).mean()`, so the
+    streamed values agree with the vectorized ones to floating-point rounding.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.values = deque(maxlen=self.window)
+        self.nobs = 0
+        self.sum = 0.0
+        self.neg_ct = 0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_value_count = 0
+        self.prev_value = None
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            self._remove(self.values[0])
+        self.values.append(value)
+        self._add(value)
+        return self.value()
+
+    def batch(self, values):
+        """Same as calling `update` on every value, computed with pandas; returns an array."""
+        return _rolling_batch(self, values, 'mean')
+
+    def _add(self, value):
+        if value != value:
+            return
+        self.nobs += 1
+        y = value - self.compensation_add
+        t = self.sum + y
+        self.compensation_add = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct += 1
+        if value == self.prev_value:
+            self.same_value_count += 1
+        else:
+            self.same_value_count = 1
+        self.prev_value = value
+
+    def _remove(self, value):
+        if value != value:
+            return
+        self.nobs -= 1
+        y = -value - self.compensation_remove
+        t = self.sum + y
+        self.compensation_remove = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct -= 1
+
+    def value(self):
+        if self.nobs < self.window:
+            return np.nan
+        if self.same_value_count >= self.nobs:
+            return self.prev_value
+        result = self.sum / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class RollingStd:
+    """
+    O(1) rolling sample standard deviation (ddof=1) using compensated Welford add/remove updates
+    in the style of pandas `rolling(window).std()`; results agree to floating-point rounding.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.values = deque(maxlen=self.window)
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_value_count = 0
+        self.prev_value = None
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            self._remove(self.values[0])
+        self.values.append(value)
+        self._add(value)
+        if self.nobs < self.window or self.nobs <= 1:
+            return np.nan
+        if self.same_value_count >= self.nobs:
+            return 0.0
+        return math.sqrt(max(self.ssqdm / (self.nobs - 1), 0.0))
+
+    def batch(self, values):
+        """Same as calling `update` on every value, computed with pandas; returns an array."""
+        return _rolling_batch(self, values, 'std')
+
+    def _add(self, value):
+        if value != value:
+            return
+        self.nobs += 1
+        prev_mean = self.mean - self.compensation_add
+        y = value - self.compensation_add
+        t = y - self.mean
+        self.compensation_add = t + self.mean - y
+        self.mean += t / self.nobs
+        self.ssqdm += (value - prev_mean) * (value - self.mean)
+        if value == self.prev_value:
+            self.same_value_count += 1
+        else:
+            self.same_value_count = 1
+        self.prev_value = value
+
+    def _remove(self, value):
+        if value != value:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean - self.compensation_remove
+            y = value - self.compensation_remove
+            t = y - self.mean
+            self.compensation_remove = t + self.mean - y
+            self.mean -= t / self.nobs
+            self.ssqdm -= (value - prev_mean) * (value - self.mean)
+        else:
+            self.mean = 0.0
+            self.ssqdm = 0.0
+
+
+class EMA:
+    """
+    Recursive exponential moving average, equivalent to pandas `ewm(span=..., adjust=False).mean()`
+    (or `ewm(alpha=...)` when `alpha` is given). NaN inputs are skipped like in pandas.
+    """
+
+    def __init__(self, span=None, alpha=None):
+        if alpha is None:
+            com = (span - 1) / 2.0
+            alpha = 1.0 / (1.0 + com)
+        self.alpha = alpha
+        self.old_weight = 1.0 - alpha
+        self.weighted = np.nan
+
+    def update(self, value):
+        if self.weighted != self.weighted:
+            self.weighted = value
+        elif value == value and self.weighted != value:
+            self.weighted = (self.old_weight * self.weighted + self.alpha * value) / (self.old_weight + self.alpha)
+        return self.weighted
+
+    def batch(self, values):
+        """Same as calling `update` on every value, computed with pandas; returns an array."""
+        values = np.asarray(values, dtype=float)
+        if not len(values):
+            return values
+        started = self.weighted == self.weighted
+        # Starting the series at the current average continues the same recursion.
+        series = np.concatenate([[self.weighted], values]) if started else values
+        result = pd.Series(series).ewm(alpha=self.alpha, adjust=False).mean().to_numpy()[int(started):]
+        self.weighted = result[-1]
+        return result
+
+
+class RSI:
+    """Wilder's relative strength index on closing prices."""
+
+    def __init__(self, period=14):
+        self.gain = EMA(alpha=1.0 / period)
+        self.loss = EMA(alpha=1.0 / period)
+        self.prev = None
+
+    def update(self, value):
+        if self.prev is None:
+            self.prev = value
+            return np.nan
+        delta = value - self.prev
+        self.prev = value
+        avg_gain = self.gain.update(max(delta, 0.0))
+        avg_loss = self.loss.update(max(-delta, 0.0))
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    def batch(self, values):
+        """Same as calling `update` on every value, computed with pandas; returns an array."""
+        values = np.asarray(values, dtype=float)
+        if not len(values):
+            return values
+        started = self.prev is not None
+        # The very first value only sets the previous close, like in `update`.
+        delta = np.diff(np.concatenate([[self.prev], values]) if started else values)
+        avg_gain = self.gain.batch(np.maximum(delta, 0.0))
+        avg_loss = self.loss.batch(np.maximum(-delta, 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+        self.prev = values[-1]
+        return rsi if started else np.concatenate([[np.nan], rsi])
+
+
+class MACD:
+    """MACD line, signal line and histogram."""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, value):
+        macd = self.fast.update(value) - self.slow.update(value)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+    def batch(self, values):
+        macd = self.fast.batch(values) - self.slow.batch(values)
+        signal = self.signal.batch(macd)
+        return macd, signal, macd - signal
+
+
+class BollingerBands:
+    """Middle, upper and lower Bollinger bands."""
+
+    def __init__(self, window=20, num_std=2.0):
+        self.mean = RollingMean(window)
+        self.std = RollingStd(window)
+        self.num_std = num_std
+
+    def update(self, value):
+        mid = self.mean.update(value)
+        band = self.num_std * self.std.update(value)
+        return mid, mid + band, mid - band
+
+    def batch(self, values):
+        mid = self.mean.batch(values)
+        band = self.num_std * self.std.batch(values)
+        return mid, mid + band, mid - band
+
+
+class Spread:
+    """Difference of two inputs, e.g. the high-low range of a candle."""
+
+    def update(self, high, low):
+        return high - low
+
+    def batch(self, high, low):
+        return np.asarray(high, dtype=float) - np.asarray(low, dtype=float)
+
+
+# Each spec is (output column(s), input column(s), indicator factory). Specs are evaluated in
+# order, so later specs can read the outputs of earlier ones (Range_SMA10 reads Daily_Range).
+DASHBOARD_INDICATORS = (
+    ('SMA20', 'close', lambda: RollingMean(20)),
+    ('EMA20', 'close', lambda: EMA(20)),
+    ('Volume_SMA20', 'volume', lambda: RollingMean(20)),
+    ('Daily_Range', ('high', 'low'), Spread),
+    ('Range_SMA10', 'Daily_Range', lambda: RollingMean(10)),
+)
+
+TRAINING_INDICATORS = (
+    ('SMA_7', 'close', lambda: RollingMean(7)),
+    ('EMA_7', 'close', lambda: EMA(7)),
+    ('SMA_30', 'close', lambda: RollingMean(30)),
+    ('EMA_30', 'close', lambda: EMA(30)),
+)
+
+OSCILLATOR_INDICATORS = (
+    ('RSI14', 'close', lambda: RSI(14)),
+    (('MACD', 'MACD_signal', 'MACD_hist'), 'close', lambda: MACD(12, 26, 9)),
+    (('BB_mid', 'BB_upper', 'BB_lower'), 'close', lambda: BollingerBands(20, 2.0)),
+)
+
+
+class IndicatorEngine:
+    """
+    Stateful technical indicator calculator that does O(1) work per new candle, for consumers
+    that see one candle at a time (e.g. the inference service).
+    `update` consumes one candle and agrees with pandas `rolling`/`ewm(adjust=False)` on the same
+    candles to floating-point rounding; `update_many` consumes a block with pandas and, on a fresh
+    engine, gives exactly the pandas values. For a whole frame use `compute_indicators`.
+    """
+
+    def __init__(self, specs=DASHBOARD_INDICATORS):
+        self.specs = tuple(specs)
+        self.output_names = []
+        self.input_names = []
+        for names, sources, _ in self.specs:
+            names = (names,) if isinstance(names, str) else tuple(names)
+            sources = (sources,) if isinstance(sources, str) else tuple(sources)
+            self.output_names.extend(names)
+            self.input_names.extend(s for s in sources if s not in self.output_names and s not in self.input_names)
+        self.reset()
+
+    def reset(self):
+        """Drops all indicator state."""
+        self.indicators = []
+        for names, sources, factory in self.specs:
+            names = (names,) if isinstance(names, str) else tuple(names)
+            sources = (sources,) if isinstance(sources, str) else tuple(sources)
+            self.indicators.append((names, sources, factory()))
+
+    def update(self, candle):
+        """
+        Feeds one candle to every indicator.
+        Parameters:
+        - candle: A mapping with at least the input columns (e.g., close, volume, high, low).
+        Returns:
+        - A dict mapping each output column to its latest value.
+        """
+        values = {name: float(candle[name]) for name in self.input_names}
+        for names, sources, indicator in self.indicators:
+            result = indicator.update(*(values[source] for source in sources))
+            if len(names) == 1:
+                values[names[0]] = result
+            else:
+                values.update(zip(names, result))
+        return {name: values[name] for name in self.output_names}
+
+    def update_many(self, columns):
+        """
+        Feeds a block of candles to every indicator with vectorized pandas computations; the state
+        afterwards is the same as after calling `update` on each candle.
+        Parameters:
+        - columns: A mapping of each input column to an array with one value per candle.
+        Returns:
+        - A dict mapping each output column to an array aligned with the inputs.
+        """
+        values = {name: np.asarray(columns[name], dtype=float) for name in self.input_names}
+        for names, sources, indicator in self.indicators:
+            result = indicator.batch(*(values[source] for source in sources))
+            if len(names) == 1:
+                values[names[0]] = result
+            else:
+                values.update(zip(names, result))
+        return {name: values[name] for name in self.output_names}
+
+
+def compute_indicators(df, specs=DASHBOARD_INDICATORS):
+    """
+    Returns a copy of `df` with the indicator columns of `specs` attached, computed vectorized
+    over the whole frame (the same values as pandas `rolling`/`ewm(adjust=False)` on it).
+    """
+    engine = IndicatorEngine(specs)
+    outputs = engine.update_many({name: df[name].to_numpy(dtype=float) for name in engine.input_names})
+    # One concat instead of a column insert per output, each of which would copy.
+    return pd.concat([df, pd.DataFrame(outputs, index=df.index, columns=engine.output_names)], axis=1)
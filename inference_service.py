@@ -0,0 +1,270 @@
+"""
+Batched LSTM inference service.
+
+Loads every product's model and scalers once, keeps a rolling window of feature rows per product
+in a preallocated `CandleBuffer` and, whenever a new candle closes, predicts the next close for all
+products in a single compiled TensorFlow call. Predictions are written to `coinbase_predictions`
+with one bulk insert. With `--runtime numpy` the service loads the `.npz` exports written by
+`model_export.py` instead and never imports TensorFlow.
+
+Usage:
+    python inference_service.py models_900 --granularity 900
+    python inference_service.py models_900 --runtime numpy
+"""
+import argparse
+import os
+import pickle
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from candle_buffer import CandleBuffer
+from history_cache import execute_query
+from indicators import TRAINING_INDICATORS, IndicatorEngine
+from metrics import REGISTRY, start_metrics_server
+from model_export import NumpyLSTM, export_path
+from train_pipeline import FEATURE_COLUMNS
+
+# Extra candles fed before the first window so SMA_30/EMA_30 are warmed up like in training.
+WARMUP_CANDLES = 64
+
+PREDICT_SECONDS = REGISTRY.histogram('inference_predict_seconds', 'Time of one batched prediction over all ready products.')
+PREDICTIONS_WRITTEN = REGISTRY.counter('inference_predictions_total', 'Prediction rows written by product.')
+
+
+RUNTIMES = ('keras', 'numpy')
+
+
+def discover_products(model_dir, extension='.h5'):
+    """Lists the products that have a saved `model_{product_id}{extension}` in `model_dir`."""
+    return sorted(
+        name[len('model_'):-len(extension)]
+        for name in os.listdir(model_dir)
+        if name.startswith('model_') and name.endswith(extension)
+    )
+
+
+class PredictionService:
+
+    def __init__(self, model_dir, product_ids=None, sequence_length=192, granularity=900, supabase=None,
+                 runtime='keras'):
+        if runtime not in RUNTIMES:
+            raise ValueError(f"runtime must be one of {RUNTIMES}")
+        self.model_dir = model_dir
+        self.runtime = runtime
+        extension = '.npz' if runtime == 'numpy' else '.h5'
+        self.product_ids = list(product_ids or discover_products(model_dir, extension))
+        self.sequence_length = sequence_length
+        self.granularity = granularity
+        self.supabase = supabase
+
+        self.engines = {product_id: IndicatorEngine(TRAINING_INDICATORS) for product_id in self.product_ids}
+        self.windows = {product_id: CandleBuffer(sequence_length, FEATURE_COLUMNS) for product_id in self.product_ids}
+        self.seen = {product_id: 0 for product_id in self.product_ids}
+        self.last_times = {product_id: None for product_id in self.product_ids}
+
+        if runtime == 'numpy':
+            # Each export carries its scalers, so nothing else is loaded.
+            self.models = {
+                product_id: NumpyLSTM.load(export_path(model_dir, product_id)) for product_id in self.product_ids
+            }
+        else:
+            self._load_keras_models()
+
+    def _load_keras_models(self):
+        import tensorflow as tf
+
+        model_dir = self.model_dir
+        self.models = {}
+        self.scalers = {}
+        for product_id in self.product_ids:
+            self.models[product_id] = tf.keras.models.load_model(
+                os.path.join(model_dir, f"model_{product_id}.h5"), compile=False
+            )
+            with open(os.path.join(model_dir, f"scaler_X_{product_id}.pkl"), 'rb') as f:
+                scaler_X = pickle.load(f)
+            with open(os.path.join(model_dir, f"scaler_y_{product_id}.pkl"), 'rb') as f:
+                scaler_y = pickle.load(f)
+            self.scalers[product_id] = (scaler_X, scaler_y)
+
+        models = [self.models[product_id] for product_id in self.product_ids]
+
+        # One traced graph runs every product model, so a tick costs one TensorFlow dispatch
+        # instead of one Keras predict() per product.
+        @tf.function(reduce_retracing=True)
+        def predict_all(windows):
+            return [model(window, training=False) for model, window in zip(models, windows)]
+
+        self._predict_all = predict_all
+        self._tf = tf
+
+    def add_candle(self, product_id, candle):
+        """
+        Appends one closed candle to a product's rolling window.
+        Parameters:
+        - product_id: The trading pair (e.g., BTC-USD).
+        - candle: A mapping with time, low, high, open, close and volume.
+        Returns:
+        - True if the candle was new, False if it was at or before the last one seen.
+        """
+        candle_time = pd.Timestamp(candle['time'])
+        if candle_time.tzinfo is None:
+            candle_time = candle_time.tz_localize('UTC')
+        last_time = self.last_times[product_id]
+        if last_time is not None and candle_time <= last_time:
+            return False
+
+        indicators = self.engines[product_id].update(candle)
+        values = {**{key: candle[key] for key in ('low', 'high', 'open', 'close', 'volume')}, **indicators}
+        self.windows[product_id].append(candle_time.timestamp(), values)
+        self.seen[product_id] += 1
+        self.last_times[product_id] = candle_time
+        return True
+
+    def add_candles(self, product_id, df):
+        """Feeds a time-sorted candle frame (e.g. from `CoinbaseAPI.get_candles`) into the window."""
+        added = 0
+        for candle in df.to_dict('records'):
+            added += self.add_candle(product_id, candle)
+        return added
+
+    def is_ready(self, product_id):
+        """A product is ready once its window is full and its indicators are warmed up."""
+        return self.seen[product_id] >= self.sequence_length + WARMUP_CANDLES
+
+    def predict(self, product_ids=None):
+        """
+        Predicts the next close for every ready product in one batched call.
+        Parameters:
+        - product_ids: Products to return predictions for (defaults to all ready products).
+        Returns:
+        - A list of rows with product_id, prediction_date and predicted_price.
+        """
+        wanted = [p for p in (product_ids or self.product_ids) if self.is_ready(p)]
+        if not wanted:
+            return []
+
+        prices = self._predict_numpy(wanted) if self.runtime == 'numpy' else self._predict_keras(wanted)
+        rows = []
+        for product_id in wanted:
+            prediction_date = self.last_times[product_id] + timedelta(seconds=self.granularity)
+            rows.append({
+                'product_id': product_id,
+                'prediction_date': prediction_date.isoformat(),
+                'predicted_price': prices[product_id]
+            })
+        return rows
+
+    def _predict_numpy(self, wanted):
+        # Every product has its own weights, so there is nothing to batch across products.
+        with PREDICT_SECONDS.time():
+            return {
+                product_id: float(self.models[product_id].predict(self.windows[product_id].window()[np.newaxis])[0])
+                for product_id in wanted
+            }
+
+    def _predict_keras(self, wanted):
+        inputs = []
+        for product_id in self.product_ids:
+            scaler_X, _ = self.scalers[product_id]
+            if product_id in wanted:
+                # A view of the buffer; the scaling below writes into a new array.
+                window = self.windows[product_id].window()
+                # MinMaxScaler.transform, without the per-call validation overhead.
+                scaled = window * scaler_X.scale_ + scaler_X.min_
+            else:
+                scaled = np.zeros((self.sequence_length, len(FEATURE_COLUMNS)))
+            inputs.append(self._tf.constant(scaled[np.newaxis], dtype=self._tf.float32))
+
+        with PREDICT_SECONDS.time():
+            outputs = self._predict_all(inputs)
+        prices = {}
+        for product_id, output in zip(self.product_ids, outputs):
+            if product_id in wanted:
+                _, scaler_y = self.scalers[product_id]
+                prices[product_id] = float(scaler_y.inverse_transform(output.numpy().reshape(-1, 1))[0, 0])
+        return prices
+
+    def write_predictions(self, rows):
+        """Writes prediction rows to `coinbase_predictions` with a single bulk insert."""
+        if rows and self.supabase is not None:
+            execute_query(self.supabase.table('coinbase_predictions').insert(rows), 'coinbase_predictions')
+            for row in rows:
+                PREDICTIONS_WRITTEN.inc(product_id=row['product_id'])
+        return len(rows)
+
+    def warm_up(self, api):
+        """Backfills enough closed candles for every product to fill its window."""
+        end = _last_closed_candle(self.granularity)
+        start = end - timedelta(seconds=self.granularity * (self.sequence_length + WARMUP_CANDLES))
+        frames = api.get_candles_range(self.product_ids, start, end, self.granularity)
+        for product_id, df in frames.items():
+            self.add_candles(product_id, df)
+
+    def step(self, api):
+        """
+        Fetches the candles that closed since the last step, predicts and writes the results.
+        Returns:
+        - The prediction rows written.
+        """
+        end = _last_closed_candle(self.granularity)
+        known = [t for t in self.last_times.values() if t is not None]
+        start = min(known) + timedelta(seconds=self.granularity) if known else end
+        if start > end:
+            return []
+        frames = api.get_candles_range(self.product_ids, start, end, self.granularity)
+        updated = [product_id for product_id, df in frames.items() if self.add_candles(product_id, df)]
+        rows = self.predict(updated) if updated else []
+        self.write_predictions(rows)
+        return rows
+
+    def run_forever(self, api, delay=15):
+        """Runs `step` shortly after every candle boundary."""
+        self.warm_up(api)
+        while True:
+            try:
+                rows = self.step(api)
+                print(f"{datetime.now(timezone.utc):%Y-%m-%d %H:%M:%S} wrote {len(rows)} predictions")
+            except Exception as e:
+                print(f"Error running predictions: {e}")
+            now = time.time()
+            next_boundary = (now // self.granularity + 1) * self.granularity
+            time.sleep(next_boundary - now + delay)
+
+
+def _last_closed_candle(granularity):
+    """Start time of the most recent fully closed candle."""
+    now = int(time.time())
+    return datetime.fromtimestamp((now // granularity - 1) * granularity, tz=timezone.utc)
+
+
+def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from data_fetcher import CoinbaseAPI
+
+    parser = argparse.ArgumentParser(description='Serve LSTM predictions for every product.')
+    parser.add_argument('model_dir')
+    parser.add_argument('--granularity', type=int, default=900)
+    parser.add_argument('--sequence-length', type=int, default=192)
+    parser.add_argument('--products', nargs='*', default=None)
+    parser.add_argument('--runtime', choices=RUNTIMES, default='keras',
+                        help='numpy serves the .npz exports without importing TensorFlow.')
+    parser.add_argument('--metrics-port', type=int, default=None, help='Serve /metrics and /metrics.json on this port.')
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
+    load_dotenv()
+    supabase = create_client(os.environ['SUPABASE_URL'], os.environ['SUPABASE_KEY'])
+    service = PredictionService(
+        args.model_dir, args.products, args.sequence_length, args.granularity, supabase, args.runtime
+    )
+    service.run_forever(CoinbaseAPI())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import pandas as pd
+
+from downsampling import MAX_CHART_CANDLES, MAX_LINE_POINTS, candle_colors, choose_resolution, lttb, resample_ohlcv
+
+# Re-run LTTB over the whole line once appended points push it this far past its budget.
+LTTB_SLACK = 1.25
+
+
+def _extend(drawn, tail, time_column, window_start):
+    """
+    Replaces the last drawn row with `tail` (which starts at that row's time, so a candle or
+    bucket that was still filling is redrawn) and drops rows that left the window.
+    """
+    last = drawn[time_column].iloc[-1]
+    head = drawn[(drawn[time_column] >= window_start) & (drawn[time_column] < last)]
+    return pd.concat([head, tail], ignore_index=True)
+
+
+class LiveCandlestickChart:
+    """
+    Candlestick + volume figure kept across refreshes.
+    The first `update` builds the figure; later ones re-aggregate only the candles from the last
+    drawn bucket on and write the arrays into the existing traces, so a refresh costs the new
+    candles rather than a full `make_subplots` rebuild. `uirevision` keeps the user's zoom and pan.
+    """
+
+    def __init__(self, build, revision, max_candles=MAX_CHART_CANDLES):
+        """
+        Parameters:
+        - build: Callable taking the (already downsampled) candles and returning a new figure.
+        - revision: Identifies the view (e.g. pair and timeframe); zoom survives while it is unchanged.
+        - max_candles: Candle budget used to choose the resolution.
+        """
+        self.build = build
+        self.revision = revision
+        self.max_candles = max_candles
+        self.figure = None
+        self.drawn = None
+        self.resolution = None
+
+    def _downsample(self, df, resolution):
+        columns = ['time', 'open', 'high', 'low', 'close', 'volume']
+        return resample_ohlcv(df, resolution) if resolution else df[columns].reset_index(drop=True)
+
+    def update(self, df):
+        """Returns the figure for `df`, updated in place when possible."""
+        resolution = choose_resolution(df['time'], self.max_candles)
+        rebuild = (
+            self.figure is None or df.empty or resolution != self.resolution
+            or df['time'].iloc[-1] < self.drawn['time'].iloc[-1]
+            or df['time'].iloc[0] > self.drawn['time'].iloc[-1]
+        )
+        if rebuild:
+            self.resolution = resolution
+            self.drawn = self._downsample(df, resolution)
+            self.figure = self.build(self.drawn)
+            self.figure.update_layout(uirevision=self.revision)
+            return self.figure
+
+        last = self.drawn['time'].iloc[-1]
+        tail = self._downsample(df[df['time'] >= last], resolution)
+        window_start = df['time'].iloc[0].floor(resolution) if resolution else df['time'].iloc[0]
+        self.drawn = _extend(self.drawn, tail, 'time', window_start)
+
+        drawn = self.drawn
+        with self.figure.batch_update():
+            self.figure.data[0].update(
+                x=drawn['time'], open=drawn['open'], high=drawn['high'], low=drawn['low'], close=drawn['close']
+            )
+            self.figure.data[1].update(x=drawn['time'], y=drawn['volume'], marker_color=candle_colors(drawn))
+        return self.figure
+
+
+class LivePredictionChart:
+    """
+    Price line + predictions figure kept across refreshes.
+    New candles and predictions are appended to the already decimated lines; LTTB is re-run over
+    the full data only once a line has grown `LTTB_SLACK` times past its point budget.
+    """
+
+    def __init__(self, build, revision, max_points=MAX_LINE_POINTS):
+        """
+        Parameters:
+        - build: Callable taking (historical_df, prediction_df) and returning a new figure.
+        - revision: Identifies the view (e.g. pair and timeframe); zoom survives while it is unchanged.
+        - max_points: Point budget per line.
+        """
+        self.build = build
+        self.revision = revision
+        self.max_points = max_points
+        self.figure = None
+        self.history = None
+        self.predictions = None
+
+    def _extend_line(self, drawn, df, x_column, y_column):
+        if df.empty:
+            return df
+        last = drawn[x_column].iloc[-1]
+        drawn = _extend(drawn, df.loc[df[x_column] >= last, [x_column, y_column]], x_column, df[x_column].iloc[0])
+        if len(drawn) > self.max_points * LTTB_SLACK:
+            drawn = lttb(df[[x_column, y_column]], x_column, y_column, self.max_points).reset_index(drop=True)
+        return drawn
+
+    def update(self, historical_df, prediction_df):
+        """Returns the figure for the given frames, updated in place when possible."""
+        rebuild = (
+            self.figure is None or historical_df.empty
+            # The prediction traces only exist when there were predictions at build time.
+            or self.predictions.empty != prediction_df.empty
+            or historical_df['time'].iloc[-1] < self.history['time'].iloc[-1]
+            or historical_df['time'].iloc[0] > self.history['time'].iloc[-1]
+            or (not prediction_df.empty and (
+                prediction_df['prediction_date'].iloc[-1] < self.predictions['prediction_date'].iloc[-1]
+                or prediction_df['prediction_date'].iloc[0] > self.predictions['prediction_date'].iloc[-1]
+            ))
+        )
+        if rebuild:
+            self.history = lttb(historical_df[['time', 'close']], 'time', 'close', self.max_points).reset_index(drop=True)
+            self.predictions = lttb(
+                prediction_df[['prediction_date', 'predicted_price']], 'prediction_date', 'predicted_price', self.max_points
+            ).reset_index(drop=True)
+            self.figure = self.build(self.history, self.predictions)
+            self.figure.update_layout(uirevision=self.revision)
+            return self.figure
+
+        self.history = self._extend_line(self.history, historical_df, 'time', 'close')
+        self.predictions = self._extend_line(self.predictions, prediction_df, 'prediction_date', 'predicted_price')
+
+        history, predictions = self.history, self.predictions
+        with self.figure.batch_update():
+            self.figure.data[0].update(x=history['time'], y=history['close'])
+            if not predictions.empty:
+                latest = predictions.iloc[-1]
+                self.figure.data[1].update(x=predictions['prediction_date'], y=predictions['predicted_price'])
+                self.figure.data[2].update(
+                    x=[latest['prediction_date']], y=[latest['predicted_price']],
+                    text=[f"Pred: {latest['predicted_price']:.2f}"]
+                )
+        return self.figure
@@ -0,0 +1,240 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import websocket
+
+from candle_buffer import CandleBuffer, candles_frame
+
+CANDLE_COLUMNS = ['time', 'low', 'high', 'open', 'close', 'volume']
+
+
+def _parse_time(value):
+    """Parses an ISO8601 timestamp from the feed into a timezone-aware datetime."""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class CandleAggregator:
+    """
+    Builds OHLCV candles from individual trades for several granularities at once.
+    The candle currently being filled is kept open; once a trade lands in a later bucket it is
+    closed and written into a preallocated `CandleBuffer`, so memory stays constant per product.
+    """
+
+    def __init__(self, granularities=(60, 300, 900), max_candles=500):
+        self.granularities = tuple(granularities)
+        self.max_candles = max_candles
+        self.open_candles = {}
+        self.closed_candles = {}
+        self.lock = threading.Lock()
+
+    def add_trade(self, product_id, trade_time, price, size):
+        """
+        Adds one trade to the open candle of every granularity.
+        Parameters:
+        - product_id: The trading pair the trade belongs to (e.g., BTC-USD).
+        - trade_time: Trade time as a timezone-aware datetime.
+        - price: Trade price.
+        - size: Trade size in base currency.
+        """
+        epoch = trade_time.timestamp()
+        with self.lock:
+            for granularity in self.granularities:
+                key = (product_id, granularity)
+                bucket = int(epoch // granularity) * granularity
+                candle = self.open_candles.get(key)
+                if candle is None or bucket > candle['time']:
+                    if candle is not None:
+                        closed = self.closed_candles.get(key)
+                        if closed is None:
+                            closed = self.closed_candles[key] = CandleBuffer(self.max_candles, CANDLE_COLUMNS[1:])
+                        closed.append(candle['time'], candle)
+                    self.open_candles[key] = {
+                        'time': bucket, 'low': price, 'high': price,
+                        'open': price, 'close': price, 'volume': size
+                    }
+                elif bucket == candle['time']:
+                    candle['low'] = min(candle['low'], price)
+                    candle['high'] = max(candle['high'], price)
+                    candle['close'] = price
+                    candle['volume'] += size
+                # Trades for an already closed bucket arrive only around reconnects and are dropped.
+
+    def get_candles(self, product_id, granularity, include_open=True):
+        """
+        Returns the candles built so far for a product.
+        Parameters:
+        - product_id: The trading pair (e.g., BTC-USD).
+        - granularity: Candle size in seconds; must be one of `granularities`.
+        - include_open: Whether to include the candle that is still being filled.
+        Returns:
+        - A DataFrame with the same columns as `CoinbaseAPI.get_candles`, sorted by time.
+        """
+        key = (product_id, granularity)
+        columns = CANDLE_COLUMNS[1:]
+        with self.lock:
+            closed = self.closed_candles.get(key)
+            times = closed.epochs() if closed is not None else np.empty(0, dtype=np.int64)
+            values = closed.window() if closed is not None else np.empty((0, len(columns)))
+            candle = self.open_candles.get(key) if include_open else None
+            if candle is not None:
+                times = np.append(times, candle['time'])
+                values = np.vstack([values, [[candle[column] for column in columns]]])
+            # Copied while the lock is held; the views are overwritten by later candles.
+            return candles_frame(times, values, columns)
+
+
+class CoinbaseMarketStream:
+    """
+    Background client for the Coinbase Exchange WebSocket feed.
+    Subscribes to the ticker and matches channels, keeps the latest ticker of every product in
+    memory and aggregates matches into OHLCV candles. The connection runs on a daemon thread
+    and is re-established with exponential backoff whenever it drops.
+    """
+
+    def __init__(self, product_ids, url="wss://ws-feed.exchange.coinbase.com",
+                 channels=('ticker', 'matches'), granularities=(60, 300, 900),
+                 max_candles=500, max_backoff=30):
+        self.product_ids = list(product_ids)
+        self.url = url
+        self.channels = list(channels)
+        self.candles = CandleAggregator(granularities, max_candles)
+        self.max_backoff = max_backoff
+
+        self.tickers = {}
+        self.last_trade_ids = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.connected = threading.Event()
+        self.thread = None
+        self.ws = None
+        self.reconnects = 0
+        self.last_error = None
+
+    def start(self):
+        """Starts the background connection thread if it is not already running."""
+        if self.thread is not None and self.thread.is_alive():
+            return self
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='coinbase-market-stream', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """Closes the connection and waits for the background thread to exit."""
+        self.stop_event.set()
+        if self.ws is not None:
+            self.ws.close()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _run(self):
+        backoff = 1
+        while not self.stop_event.is_set():
+            self.ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            started = time.monotonic()
+            self.ws.run_forever(ping_interval=20, ping_timeout=10)
+            self.connected.clear()
+            if self.stop_event.is_set():
+                break
+            # A connection that stayed up for a while resets the backoff.
+            if time.monotonic() - started > self.max_backoff:
+                backoff = 1
+            self.reconnects += 1
+            self.stop_event.wait(backoff)
+            backoff = min(self.max_backoff, backoff * 2)
+
+    def _on_open(self, ws):
+        ws.send(json.dumps({
+            'type': 'subscribe',
+            'product_ids': self.product_ids,
+            'channels': self.channels
+        }))
+        self.connected.set()
+
+    def _on_message(self, ws, message):
+        self.handle_message(json.loads(message))
+
+    def _on_error(self, ws, error):
+        self.last_error = error
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        self.connected.clear()
+
+    def handle_message(self, message):
+        """
+        Applies one decoded feed message to the in-memory state.
+        Parameters:
+        - message: A dict decoded from the feed (ticker, match, last_match, subscriptions, error).
+        """
+        message_type = message.get('type')
+        if message_type == 'ticker':
+            self._handle_ticker(message)
+        elif message_type in ('match', 'last_match'):
+            self._handle_match(message)
+        elif message_type == 'error':
+            self.last_error = message.get('message')
+
+    def _handle_ticker(self, message):
+        if 'price' not in message:
+            return
+        ticker = {
+            'price': float(message['price']),
+            'volume': float(message.get('volume_24h') or 0),
+            'bid': float(message.get('best_bid') or message['price']),
+            'ask': float(message.get('best_ask') or message['price']),
+            'time': _parse_time(message['time']) if message.get('time') else None,
+            'received_at': time.time()
+        }
+        with self.lock:
+            self.tickers[message['product_id']] = ticker
+
+    def _handle_match(self, message):
+        product_id = message['product_id']
+        trade_id = message.get('trade_id')
+        with self.lock:
+            if trade_id is not None:
+                # Matches are replayed after a reconnect; trade ids only increase per product.
+                if trade_id <= self.last_trade_ids.get(product_id, -1):
+                    return
+                self.last_trade_ids[product_id] = trade_id
+        self.candles.add_trade(
+            product_id,
+            _parse_time(message['time']),
+            float(message['price']),
+            float(message['size'])
+        )
+
+    def get_ticker(self, product_id, max_age=None):
+        """
+        Returns the latest ticker received for a product.
+        Parameters:
+        - product_id: The trading pair (e.g., BTC-USD).
+        - max_age: If given, tickers received more than `max_age` seconds ago are treated as missing.
+        Returns:
+        - A dict with price, volume, bid, ask and time, or None if no fresh ticker is available.
+        """
+        with self.lock:
+            ticker = self.tickers.get(product_id)
+        if ticker is None:
+            return None
+        if max_age is not None and time.time() - ticker['received_at'] > max_age:
+            return None
+        return dict(ticker)
+
+    def snapshot(self):
+        """Returns a copy of the latest ticker for every product seen so far."""
+        with self.lock:
+            return {product_id: dict(ticker) for product_id, ticker in self.tickers.items()}
+
+    def get_candles(self, product_id, granularity=60, include_open=True):
+        """Returns the streamed candles for a product; see `CandleAggregator.get_candles`."""
+        return self.candles.get_candles(product_id, granularity, include_open)
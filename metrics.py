@@ -0,0 +1,261 @@
+"""
+In-process metrics: counters, latency histograms and gauges.
+
+Hot paths record into module-level metrics (`REGISTRY.counter(...)`, `REGISTRY.histogram(...)`);
+a record is a dict lookup and an add under a lock, cheap enough to leave on in production.
+`start_metrics_server` exposes the registry over HTTP:
+
+    /metrics        Prometheus text format
+    /metrics.json   JSON snapshot with approximate p50/p95/p99 per histogram
+
+Usage:
+    METRICS_PORT=9100 streamlit run app.py
+    curl localhost:9100/metrics
+"""
+import bisect
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; covers in-memory work (sub-millisecond) up to slow network calls.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    type = 'counter'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return dict(self.values)
+
+    def prometheus(self):
+        return [f'{self.name}{_format_labels(key)} {value}' for key, value in self.samples().items()]
+
+    def snapshot(self):
+        return [{'labels': dict(key), 'value': value} for key, value in self.samples().items()]
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels; `time()` records the duration of a block."""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                # Per-bucket counts (the last slot is +Inf), sum, count.
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Times the enclosed block, also when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self.lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self.values.items()}
+
+    def quantile(self, counts, count, q):
+        """Upper bound of the bucket holding the q-quantile (Prometheus-style estimate)."""
+        if not count:
+            return None
+        rank = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound if bound != math.inf else self.buckets[-1]
+        return self.buckets[-1]
+
+    def prometheus(self):
+        lines = []
+        for key, (counts, total, count) in self.samples().items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(key, [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(key, [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+    def snapshot(self):
+        return [
+            {
+                'labels': dict(key),
+                'count': count,
+                'sum': total,
+                'mean': total / count if count else None,
+                'p50': self.quantile(counts, count, 0.5),
+                'p95': self.quantile(counts, count, 0.95),
+                'p99': self.quantile(counts, count, 0.99)
+            }
+            for key, (counts, total, count) in self.samples().items()
+        ]
+
+
+class Gauge:
+    """Value read from a callback at collection time, e.g. the rate limiter's current rate."""
+
+    type = 'gauge'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.callbacks = {}
+        self.lock = threading.Lock()
+
+    def set_function(self, callback, **labels):
+        with self.lock:
+            self.callbacks[_label_key(labels)] = callback
+
+    def remove(self, **labels):
+        with self.lock:
+            self.callbacks.pop(_label_key(labels), None)
+
+    def samples(self):
+        with self.lock:
+            callbacks = dict(self.callbacks)
+        values = {}
+        for key, callback in callbacks.items():
+            try:
+                values[key] = float(callback())
+            except Exception:
+                continue
+        return values
+
+    def prometheus(self):
+        return [f'{self.name}{_format_labels(key)} {value}' for key, value in self.samples().items()]
+
+    def snapshot(self):
+        return [{'labels': dict(key), 'value': value} for key, value in self.samples().items()]
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help, **kwargs):
+        # Registering the same name again returns the existing metric, so modules can be reloaded.
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f'Metric {name} is already registered as a {metric.type}')
+            return metric
+
+    def counter(self, name, help):
+        return self._get_or_create(Counter, name, help)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def gauge(self, name, help):
+        return self._get_or_create(Gauge, name, help)
+
+    def prometheus_text(self):
+        """Every metric in the Prometheus text exposition format."""
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.prometheus())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """Every metric as plain data, for JSON."""
+        with self.lock:
+            metrics = dict(self.metrics)
+        return {
+            name: {'type': metric.type, 'help': metric.help, 'samples': metric.snapshot()}
+            for name, metric in sorted(metrics.items())
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            body = self.server.registry.prometheus_text().encode()
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif path == '/metrics.json':
+            body = json.dumps(self.server.registry.snapshot()).encode()
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host='0.0.0.0', registry=REGISTRY):
+    """
+    Serves `/metrics` (Prometheus) and `/metrics.json` from a daemon thread.
+    Returns:
+    - The running `ThreadingHTTPServer`; call `shutdown()` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
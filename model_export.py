@@ -0,0 +1,270 @@
+"""
+Compact LSTM export for TensorFlow-free CPU inference.
+
+`export_model` writes a product's trained Keras LSTM and its scalers into one
+`model_{product_id}.npz` (weights stored as float16 by default), and `NumpyLSTM` runs the forward
+pass with NumPy alone. A serving process then neither imports TensorFlow nor cold-loads `.h5`
+files. Exports are checked against the Keras model they came from, so a quantization error shows up
+at export time rather than in production.
+
+Usage:
+    python model_export.py models_900 --dtype float16
+"""
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+
+EXPORT_DTYPES = ('float16', 'float32')
+
+
+def export_path(save_dir, product_id):
+    return os.path.join(save_dir, f"model_{product_id}.npz")
+
+
+def _layer_weights(model):
+    """Returns the [kernel, recurrent_kernel, bias] of every LSTM layer and the final Dense weights."""
+    layers = [layer for layer in model.layers if type(layer).__name__ != 'Dropout']
+    *lstms, dense = layers
+    for index, layer in enumerate(lstms):
+        config = layer.get_config()
+        supported = (
+            type(layer).__name__ == 'LSTM' and config['activation'] == 'tanh'
+            and config['recurrent_activation'] == 'sigmoid' and config['use_bias']
+            and not config.get('go_backwards') and not config.get('stateful')
+            # Every layer but the last feeds its whole sequence to the next one.
+            and config['return_sequences'] == (index < len(lstms) - 1)
+        )
+        if not supported:
+            raise Exception(f"Cannot export layer {layer.name}: unsupported LSTM configuration")
+    if not lstms or type(dense).__name__ != 'Dense' or dense.get_config()['activation'] != 'linear':
+        raise Exception("Cannot export model: expected LSTM layers followed by a linear Dense layer")
+    return [layer.get_weights() for layer in lstms], dense.get_weights()
+
+
+def export_model(model, scaler_X, scaler_y, path, dtype='float16'):
+    """
+    Writes the weights of a Keras LSTM stack and its MinMax scalers to one `.npz` file.
+    Parameters:
+    - model: Trained Keras model (LSTM layers, optional Dropout, one linear Dense output).
+    - scaler_X, scaler_y: The fitted MinMaxScalers of the features and the target.
+    - path: Output file.
+    - dtype: Storage type of the weights, 'float16' (half the size) or 'float32'.
+    Returns:
+    - The path written.
+    """
+    if dtype not in EXPORT_DTYPES:
+        raise ValueError(f"dtype must be one of {EXPORT_DTYPES}")
+    lstms, (dense_kernel, dense_bias) = _layer_weights(model)
+    arrays = {'layers': np.array(len(lstms))}
+    for index, (kernel, recurrent_kernel, bias) in enumerate(lstms):
+        arrays[f'lstm_{index}_kernel'] = kernel.astype(dtype)
+        arrays[f'lstm_{index}_recurrent_kernel'] = recurrent_kernel.astype(dtype)
+        arrays[f'lstm_{index}_bias'] = bias.astype(dtype)
+    arrays['dense_kernel'] = dense_kernel.astype(dtype)
+    arrays['dense_bias'] = dense_bias.astype(dtype)
+    # The scalers stay float64: they map to and from prices, where float16 would be off by dollars.
+    arrays['x_scale'], arrays['x_min'] = scaler_X.scale_, scaler_X.min_
+    arrays['y_scale'], arrays['y_min'] = scaler_y.scale_, scaler_y.min_
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+    return path
+
+
+class NumpyLSTM:
+    """
+    Inference-only NumPy forward pass of an exported LSTM stack (Dropout is the identity at
+    inference). Computes in float32 whatever type the weights were stored in.
+    """
+
+    def __init__(self, layers, dense_kernel, dense_bias, x_scale, x_min, y_scale, y_min):
+        """
+        Parameters:
+        - layers: (kernel, recurrent_kernel, bias) per LSTM layer in Keras layout (gates i, f, c, o).
+        - dense_kernel, dense_bias: Weights of the output layer.
+        - x_scale, x_min, y_scale, y_min: `scale_` and `min_` of the feature and target MinMaxScalers.
+        """
+        self.layers = []
+        for kernel, recurrent_kernel, bias in layers:
+            units = recurrent_kernel.shape[0]
+            # sigmoid(z) = 0.5 * tanh(z / 2) + 0.5, so with the i, f and o columns halved a single
+            # tanh per step yields all four gates.
+            factor = np.full(4 * units, 0.5, dtype=np.float32)
+            factor[2 * units:3 * units] = 1.0
+            self.layers.append((
+                kernel.astype(np.float32) * factor,
+                recurrent_kernel.astype(np.float32) * factor,
+                bias.astype(np.float32) * factor,
+                units
+            ))
+        self.dense_kernel = dense_kernel.astype(np.float32)
+        self.dense_bias = dense_bias.astype(np.float32)
+        self.x_scale, self.x_min = np.asarray(x_scale), np.asarray(x_min)
+        self.y_scale, self.y_min = np.asarray(y_scale), np.asarray(y_min)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            layers = [
+                (data[f'lstm_{index}_kernel'], data[f'lstm_{index}_recurrent_kernel'], data[f'lstm_{index}_bias'])
+                for index in range(int(data['layers']))
+            ]
+            return cls(
+                layers, data['dense_kernel'], data['dense_bias'],
+                data['x_scale'], data['x_min'], data['y_scale'], data['y_min']
+            )
+
+    def predict_scaled(self, X):
+        """
+        Runs scaled windows through the network.
+        Parameters:
+        - X: Array of shape (batch, timesteps, features), already transformed by scaler_X.
+        Returns:
+        - Scaled predictions of shape (batch, 1), like `model.predict`.
+        """
+        sequence = np.asarray(X, dtype=np.float32)
+        batch, steps, _ = sequence.shape
+        for index, (kernel, recurrent_kernel, bias, units) in enumerate(self.layers):
+            # The input projection of every timestep is one matmul; only the recurrence is sequential.
+            projected = (sequence.reshape(batch * steps, -1) @ kernel + bias).reshape(batch, steps, 4 * units)
+            keep_sequence = index < len(self.layers) - 1
+            outputs = np.empty((batch, steps, units), dtype=np.float32) if keep_sequence else None
+            h = np.zeros((batch, units), dtype=np.float32)
+            c = np.zeros((batch, units), dtype=np.float32)
+            for step in range(steps):
+                z = np.tanh(projected[:, step] + h @ recurrent_kernel)
+                gates = 0.5 * z + 0.5
+                c = gates[:, units:2 * units] * c + gates[:, :units] * z[:, 2 * units:3 * units]
+                h = gates[:, 3 * units:] * np.tanh(c)
+                if keep_sequence:
+                    outputs[:, step] = h
+            sequence = outputs
+        return h @ self.dense_kernel + self.dense_bias
+
+    def predict(self, windows):
+        """
+        Predicts prices from unscaled feature windows.
+        Parameters:
+        - windows: Array of shape (batch, timesteps, features) in the units of the training features.
+        Returns:
+        - A float64 array with one predicted price per window.
+        """
+        scaled = self.predict_scaled(np.asarray(windows) * self.x_scale + self.x_min)
+        # MinMaxScaler.inverse_transform.
+        return ((scaled.astype(np.float64) - self.y_min) / self.y_scale)[:, 0]
+
+
+def compare_with_keras(model, exported, X, scaler_y, y=None, batch_size=256):
+    """
+    Predicts the same scaled windows with the Keras model and its export.
+    Parameters:
+    - model: The Keras model.
+    - exported: Its `NumpyLSTM`.
+    - X: Scaled windows of shape (batch, timesteps, features).
+    - scaler_y: The target scaler, to report the differences in price units.
+    - y: Optional scaled targets; adds the RMSE of both models against them.
+    Returns:
+    - A dict with the maximum and mean absolute difference between the two predictions and,
+      when `y` is given, `keras_rmse` and `export_rmse`.
+    """
+    from windowing import make_tf_dataset
+
+    # Batches are built lazily, so strided window views are never copied whole.
+    keras_prices = scaler_y.inverse_transform(model.predict(make_tf_dataset(X, batch_size=batch_size), verbose=0))[:, 0]
+    export_prices = np.concatenate([
+        scaler_y.inverse_transform(exported.predict_scaled(X[start:start + batch_size]))[:, 0]
+        for start in range(0, len(X), batch_size)
+    ])
+    difference = np.abs(export_prices - keras_prices)
+    report = {'max_abs_diff': float(difference.max()), 'mean_abs_diff': float(difference.mean())}
+    if y is not None:
+        actual = scaler_y.inverse_transform(y)[:, 0]
+        report['keras_rmse'] = float(np.sqrt(np.mean((keras_prices - actual) ** 2)))
+        report['export_rmse'] = float(np.sqrt(np.mean((export_prices - actual) ** 2)))
+    return report
+
+
+def export_and_check(model, scaler_X, scaler_y, path, X, y=None, dtype='float16'):
+    """Exports the model, reloads the export and compares it with Keras on `X`; returns the report with `path`, `dtype` and `bytes`."""
+    export_model(model, scaler_X, scaler_y, path, dtype)
+    report = compare_with_keras(model, NumpyLSTM.load(path), X, scaler_y, y)
+    return {'path': path, 'dtype': dtype, 'bytes': os.path.getsize(path), **report}
+
+
+def _best_time(fn, repeat=20):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def export_directory(model_dir, product_ids=None, dtype='float16', samples=256, seed=0):
+    """
+    Exports every `model_{product_id}.h5` in `model_dir` and prints, per product, the file sizes,
+    load times, single-window latency and the prediction difference on random scaled windows.
+    Returns:
+    - A dict mapping product_id to its report.
+    """
+    import tensorflow as tf
+
+    from inference_service import discover_products
+
+    rng = np.random.default_rng(seed)
+    reports = {}
+    for product_id in product_ids or discover_products(model_dir):
+        h5_path = os.path.join(model_dir, f"model_{product_id}.h5")
+        started = time.perf_counter()
+        model = tf.keras.models.load_model(h5_path, compile=False)
+        keras_load = time.perf_counter() - started
+        with open(os.path.join(model_dir, f"scaler_X_{product_id}.pkl"), 'rb') as f:
+            scaler_X = pickle.load(f)
+        with open(os.path.join(model_dir, f"scaler_y_{product_id}.pkl"), 'rb') as f:
+            scaler_y = pickle.load(f)
+
+        # MinMax-scaled features lie in [0, 1] over the training range.
+        _, steps, features = model.input_shape
+        X = rng.random((samples, steps, features))
+        report = export_and_check(model, scaler_X, scaler_y, export_path(model_dir, product_id), X, dtype=dtype)
+
+        started = time.perf_counter()
+        exported = NumpyLSTM.load(report['path'])
+        report['export_load_seconds'] = time.perf_counter() - started
+        report['keras_load_seconds'] = keras_load
+        report['h5_bytes'] = os.path.getsize(h5_path)
+        # Traced like in `PredictionService`; eager Keras would be far slower still.
+        window = tf.constant(X[:1], dtype=tf.float32)
+        predict = tf.function(lambda inputs: model(inputs, training=False))
+        predict(window)
+        report['keras_predict_seconds'] = _best_time(lambda: predict(window).numpy())
+        window = window.numpy()
+        report['export_predict_seconds'] = _best_time(lambda: exported.predict_scaled(window))
+        reports[product_id] = report
+        print(
+            f"{product_id}: {report['h5_bytes'] / 1024:.0f} KB -> {report['bytes'] / 1024:.0f} KB ({dtype}), "
+            f"load {report['keras_load_seconds'] * 1e3:.0f} -> {report['export_load_seconds'] * 1e3:.1f} ms, "
+            f"predict {report['keras_predict_seconds'] * 1e3:.2f} -> {report['export_predict_seconds'] * 1e3:.2f} ms, "
+            f"max difference {report['max_abs_diff']:.6f}"
+        )
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export trained LSTMs to NumPy .npz files for CPU inference.')
+    parser.add_argument('model_dir')
+    parser.add_argument('--products', nargs='*', default=None)
+    parser.add_argument('--dtype', choices=EXPORT_DTYPES, default='float16')
+    parser.add_argument('--samples', type=int, default=256, help='Random windows used for the accuracy check.')
+    args = parser.parse_args()
+    export_directory(args.model_dir, args.products, args.dtype, args.samples)
+
+
+if __name__ == '__main__':
+    main()
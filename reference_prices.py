@@ -0,0 +1,120 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from history_cache import execute_query
+
+DEFAULT_LOOKBACKS = (1, 7, 30, 365)
+
+
+class ReferencePriceIndex:
+    """
+    In-process index of daily reference closes used for 1d/7d/30d/365d change metrics.
+    The daily close of a date is the close of its last candle (23:45 UTC for 15-minute candles).
+    A lookback of k days resolves to the latest daily close at or before now - k days, so the
+    answers only change at midnight UTC: the index is loaded once per day with a single query
+    for all requested products and lookbacks, and every other lookup is served from memory.
+    """
+
+    def __init__(self, supabase, lookbacks=DEFAULT_LOOKBACKS, granularity=900, slack_days=3, table='coinbase_data'):
+        self.supabase = supabase
+        self.lookbacks = tuple(lookbacks)
+        self.granularity = granularity
+        self.slack_days = slack_days
+        self.table = table
+        self.prices = {}
+        self.loaded_products = set()
+        self.loaded_on = None
+        self.lock = threading.Lock()
+
+    def _reference_dates(self, today, lookback):
+        """Dates whose daily close can answer a lookback, newest first (older ones cover gaps)."""
+        target = today - timedelta(days=lookback)
+        return [target - timedelta(days=offset) for offset in range(1, self.slack_days + 1)]
+
+    def _day_close_time(self, date):
+        day_end = datetime(date.year, date.month, date.day, tzinfo=timezone.utc) + timedelta(days=1)
+        return day_end - timedelta(seconds=self.granularity)
+
+    def refresh(self, product_ids, today=None):
+        """
+        Loads the daily reference closes of the given products with one query.
+        Parameters:
+        - product_ids: Trading pairs to load.
+        - today: UTC date the lookbacks are relative to (defaults to today).
+        """
+        today = today or datetime.now(timezone.utc).date()
+        product_ids = list(product_ids)
+        dates = sorted({d for lookback in self.lookbacks for d in self._reference_dates(today, lookback)})
+        times = [self._day_close_time(d).isoformat() for d in dates]
+
+        query = execute_query(
+            self.supabase.table(self.table)
+            .select('product_id,time,close')
+            .in_('product_id', product_ids)
+            .in_('time', times),
+            self.table
+        )
+        closes = {}
+        for row in query.data or []:
+            row_date = datetime.fromisoformat(row['time'].replace('Z', '+00:00')).astimezone(timezone.utc).date()
+            closes[(row['product_id'], row_date)] = float(row['close'])
+
+        prices = {}
+        for product_id in product_ids:
+            for lookback in self.lookbacks:
+                prices[(product_id, lookback)] = next(
+                    (closes[(product_id, d)] for d in self._reference_dates(today, lookback) if (product_id, d) in closes),
+                    None
+                )
+
+        with self.lock:
+            if self.loaded_on != today:
+                self.prices = {}
+                self.loaded_products = set()
+                self.loaded_on = today
+            self.prices.update(prices)
+            self.loaded_products.update(product_ids)
+
+    def get(self, product_id, lookbacks=None):
+        """
+        Returns reference closes for a product, loading it first if today's index lacks it.
+        Parameters:
+        - product_id: The trading pair (e.g., BTC-USD).
+        - lookbacks: Lookbacks in days (defaults to all configured lookbacks).
+        Returns:
+        - A dict mapping each lookback to its reference close, or None when there is no data.
+        """
+        lookbacks = tuple(lookbacks or self.lookbacks)
+        today = datetime.now(timezone.utc).date()
+        with self.lock:
+            loaded = self.loaded_on == today and product_id in self.loaded_products
+        if not loaded:
+            self.refresh([product_id], today)
+        with self.lock:
+            return {lookback: self.prices.get((product_id, lookback)) for lookback in lookbacks}
+
+    def get_many(self, product_ids, lookbacks=None):
+        """
+        Returns reference closes for several products, loading all missing ones with one query.
+        Returns:
+        - A dict mapping each product_id to {lookback: reference close or None}.
+        """
+        lookbacks = tuple(lookbacks or self.lookbacks)
+        today = datetime.now(timezone.utc).date()
+        with self.lock:
+            loaded = self.loaded_products if self.loaded_on == today else set()
+            missing = [product_id for product_id in product_ids if product_id not in loaded]
+        if missing:
+            self.refresh(missing, today)
+        with self.lock:
+            return {
+                product_id: {lookback: self.prices.get((product_id, lookback)) for lookback in lookbacks}
+                for product_id in product_ids
+            }
+
+    def changes(self, product_id, current_price, lookbacks=None):
+        """Returns the percentage change of `current_price` against each reference close."""
+        return {
+            lookback: ((current_price - price) / price) * 100 if price else None
+            for lookback, price in self.get(product_id, lookbacks).items()
+        }
@@ -0,0 +1,109 @@
+"""
+Parity tests of `indicators` against the pandas formulas the dashboard and training used before.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import (
+    DASHBOARD_INDICATORS, OSCILLATOR_INDICATORS, TRAINING_INDICATORS, IndicatorEngine, compute_indicators
+)
+
+
+def candles(size, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 50, size))
+    return pd.DataFrame({
+        'time': pd.date_range('2024-01-01', periods=size, freq='15min', tz='UTC'),
+        'low': close - rng.uniform(0, 40, size),
+        'high': close + rng.uniform(0, 40, size),
+        'open': close + rng.normal(0, 10, size),
+        'close': close,
+        'volume': rng.uniform(1, 100, size),
+    })
+
+
+def pandas_dashboard(df):
+    df = df.copy()
+    df['SMA20'] = df['close'].rolling(window=20).mean()
+    df['EMA20'] = df['close'].ewm(span=20, adjust=False).mean()
+    df['Volume_SMA20'] = df['volume'].rolling(window=20).mean()
+    df['Daily_Range'] = df['high'] - df['low']
+    df['Range_SMA10'] = df['Daily_Range'].rolling(window=10).mean()
+    return df
+
+
+def pandas_training(df):
+    df = df.copy()
+    for window in (7, 30):
+        df[f'SMA_{window}'] = df['close'].rolling(window=window).mean()
+        df[f'EMA_{window}'] = df['close'].ewm(span=window, adjust=False).mean()
+    return df
+
+
+def pandas_oscillators(df):
+    close = df['close']
+    delta = close.diff()
+    gain = delta.clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta).clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    mid = close.rolling(20).mean()
+    std = close.rolling(20).std()
+    return pd.DataFrame({
+        'RSI14': 100 - 100 / (1 + gain / loss),
+        'MACD': macd, 'MACD_signal': signal, 'MACD_hist': macd - signal,
+        'BB_mid': mid, 'BB_upper': mid + 2 * std, 'BB_lower': mid - 2 * std,
+    })
+
+
+@pytest.mark.parametrize('size', [5, 96, 2880])
+def test_compute_indicators_matches_pandas_exactly(size):
+    df = candles(size)
+    pd.testing.assert_frame_equal(compute_indicators(df), pandas_dashboard(df), check_exact=True)
+    pd.testing.assert_frame_equal(compute_indicators(df, TRAINING_INDICATORS), pandas_training(df), check_exact=True)
+
+
+def test_compute_indicators_on_sliding_window_matches_fresh_pandas():
+    df = candles(500)
+    # Every refresh of a sliding dashboard window is computed from that window alone.
+    for start in (0, 37, 200):
+        window = df.iloc[start:start + 192].reset_index(drop=True)
+        pd.testing.assert_frame_equal(compute_indicators(window), pandas_dashboard(window), check_exact=True)
+
+
+def test_compute_indicators_leaves_input_untouched():
+    df = candles(50)
+    before = df.copy()
+    compute_indicators(df)
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_oscillators_match_pandas():
+    df = candles(300)
+    expected = pandas_oscillators(df)
+    result = compute_indicators(df, OSCILLATOR_INDICATORS)
+    for name in expected.columns:
+        np.testing.assert_allclose(result[name], expected[name], rtol=1e-10, equal_nan=True, err_msg=name)
+
+
+@pytest.mark.parametrize('specs', [DASHBOARD_INDICATORS, TRAINING_INDICATORS, OSCILLATOR_INDICATORS])
+def test_streamed_updates_match_pandas_to_rounding(specs):
+    df = candles(400)
+    expected = compute_indicators(df, specs)
+    engine = IndicatorEngine(specs)
+    rows = [engine.update(candle) for candle in df.to_dict('records')]
+    streamed = pd.DataFrame(rows)
+    for name in engine.output_names:
+        np.testing.assert_allclose(streamed[name], expected[name], rtol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_update_continues_after_update_many():
+    df = candles(300)
+    expected = compute_indicators(df, DASHBOARD_INDICATORS + OSCILLATOR_INDICATORS)
+    engine = IndicatorEngine(DASHBOARD_INDICATORS + OSCILLATOR_INDICATORS)
+    head, tail = df.iloc[:250], df.iloc[250:]
+    engine.update_many({name: head[name].to_numpy() for name in engine.input_names})
+    rows = pd.DataFrame([engine.update(candle) for candle in tail.to_dict('records')], index=tail.index)
+    for name in engine.output_names:
+        np.testing.assert_allclose(rows[name], expected[name].iloc[250:], rtol=1e-9, equal_nan=True, err_msg=name)
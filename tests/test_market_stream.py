@@ -0,0 +1,243 @@
+"""
+Tests for `market_stream.CoinbaseMarketStream` against a local stand-in for the Coinbase feed.
+
+`FeedServer` is a minimal RFC 6455 server (text frames only) on the standard library, so the
+client runs its real connect, subscribe and reconnect code without network access.
+"""
+import base64
+import hashlib
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from market_stream import CoinbaseMarketStream
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def _recv_exact(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('client closed the connection')
+        data += chunk
+    return data
+
+
+class FeedConnection:
+    """One accepted client connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        request = b''
+        while b'\r\n\r\n' not in request:
+            request += conn.recv(4096)
+        headers = dict(
+            line.split(': ', 1) for line in request.decode().split('\r\n')[1:] if ': ' in line
+        )
+        accept = base64.b64encode(hashlib.sha1((headers['Sec-WebSocket-Key'] + WEBSOCKET_GUID).encode()).digest())
+        conn.sendall(
+            b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+            b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n'
+        )
+
+    def receive(self, timeout=5):
+        """Returns the next text message from the client (pings are skipped)."""
+        self.conn.settimeout(timeout)
+        while True:
+            first, second = _recv_exact(self.conn, 2)
+            length = second & 0x7f
+            if length == 126:
+                length = struct.unpack('>H', _recv_exact(self.conn, 2))[0]
+            elif length == 127:
+                length = struct.unpack('>Q', _recv_exact(self.conn, 8))[0]
+            mask = _recv_exact(self.conn, 4) if second & 0x80 else b'\x00' * 4
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(_recv_exact(self.conn, length)))
+            if first & 0x0f == 0x1:
+                return payload.decode()
+
+    def send(self, message):
+        payload = json.dumps(message).encode()
+        if len(payload) < 126:
+            header = struct.pack('>BB', 0x81, len(payload))
+        elif len(payload) < 1 << 16:
+            header = struct.pack('>BBH', 0x81, 126, len(payload))
+        else:
+            header = struct.pack('>BBQ', 0x81, 127, len(payload))
+        self.conn.sendall(header + payload)
+
+    def drop(self):
+        """Closes the TCP connection without a close frame, like a dropped feed."""
+        try:
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.conn.close()
+
+
+class FeedServer:
+    """Accepts WebSocket clients on localhost and hands each connection to the test."""
+
+    def __init__(self):
+        self.sock = socket.create_server(('127.0.0.1', 0))
+        self.url = f'ws://127.0.0.1:{self.sock.getsockname()[1]}'
+        self.connections = queue.Queue()
+        self.accepted = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            connection = FeedConnection(conn)
+            self.accepted.append(connection)
+            self.connections.put(connection)
+
+    def next_connection(self, timeout=10):
+        return self.connections.get(timeout=timeout)
+
+    def close(self):
+        self.sock.close()
+        for connection in self.accepted:
+            connection.drop()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError('condition not met in time')
+
+
+def match(trade_id, trade_time, price, size, product_id='BTC-USD', message_type='match'):
+    return {
+        'type': message_type, 'trade_id': trade_id, 'product_id': product_id,
+        'price': str(price), 'size': str(size), 'time': trade_time, 'side': 'buy'
+    }
+
+
+@pytest.fixture
+def server():
+    server = FeedServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def stream(server):
+    stream = CoinbaseMarketStream(['BTC-USD', 'ETH-USD'], url=server.url, max_backoff=1)
+    stream.start()
+    yield stream
+    # The stand-in never answers a close frame, so drop its side first (and let the client notice)
+    # instead of letting `stop` wait for the close handshake.
+    server.close()
+    wait_for(lambda: not stream.connected.is_set())
+    stream.stop()
+
+
+def subscribed(server):
+    """Accepts the next client connection and returns it with its subscribe message."""
+    connection = server.next_connection()
+    return connection, json.loads(connection.receive())
+
+
+def test_subscribe_payload(server, stream):
+    _, message = subscribed(server)
+    assert message == {'type': 'subscribe', 'product_ids': ['BTC-USD', 'ETH-USD'], 'channels': ['ticker', 'matches']}
+    assert stream.connected.wait(5)
+
+
+def test_ticker_snapshot_and_staleness(server, stream):
+    connection, _ = subscribed(server)
+    connection.send({
+        'type': 'ticker', 'product_id': 'BTC-USD', 'price': '42000.5', 'volume_24h': '1234.5',
+        'best_bid': '42000.0', 'best_ask': '42001.0', 'time': '2024-01-01T00:00:00.000000Z'
+    })
+    wait_for(lambda: stream.get_ticker('BTC-USD') is not None)
+
+    ticker = stream.get_ticker('BTC-USD')
+    assert (ticker['price'], ticker['volume'], ticker['bid'], ticker['ask']) == (42000.5, 1234.5, 42000.0, 42001.0)
+    assert ticker['time'].isoformat() == '2024-01-01T00:00:00+00:00'
+    assert set(stream.snapshot()) == {'BTC-USD'}
+    assert stream.get_ticker('ETH-USD') is None
+
+    time.sleep(0.2)
+    assert stream.get_ticker('BTC-USD', max_age=0.1) is None
+    assert stream.get_ticker('BTC-USD', max_age=60)['price'] == 42000.5
+
+
+def test_matches_aggregate_into_candles(server, stream):
+    connection, _ = subscribed(server)
+    trades = [
+        ('2024-01-01T00:00:10Z', 100, 1.0),
+        ('2024-01-01T00:00:50Z', 105, 2.0),
+        ('2024-01-01T00:01:05Z', 99, 1.0),
+        ('2024-01-01T00:05:00Z', 101, 0.5),
+        ('2024-01-01T00:15:00Z', 110, 1.0),
+    ]
+    for trade_id, (trade_time, price, size) in enumerate(trades, start=1):
+        connection.send(match(trade_id, trade_time, price, size))
+    wait_for(lambda: stream.last_trade_ids.get('BTC-USD') == len(trades))
+
+    expected = {
+        60: [('00:00', 100, 105, 100, 105, 3.0), ('00:01', 99, 99, 99, 99, 1.0),
+             ('00:05', 101, 101, 101, 101, 0.5), ('00:15', 110, 110, 110, 110, 1.0)],
+        300: [('00:00', 100, 105, 99, 99, 4.0), ('00:05', 101, 101, 101, 101, 0.5),
+              ('00:15', 110, 110, 110, 110, 1.0)],
+        900: [('00:00', 100, 105, 99, 101, 4.5), ('00:15', 110, 110, 110, 110, 1.0)],
+    }
+    for granularity, candles in expected.items():
+        df = stream.get_candles('BTC-USD', granularity)
+        rows = [
+            (row.time.strftime('%H:%M'), row.open, row.high, row.low, row.close, row.volume)
+            for row in df.itertuples()
+        ]
+        assert rows == candles, granularity
+        # The last candle is still open until a trade lands in a later bucket.
+        assert len(stream.get_candles('BTC-USD', granularity, include_open=False)) == len(candles) - 1
+    assert stream.get_candles('ETH-USD', 60).empty
+
+
+def test_trade_ids_deduplicated_across_reconnects(server, stream):
+    connection, _ = subscribed(server)
+    for trade_id in (1, 2, 3):
+        connection.send(match(trade_id, f'2024-01-01T00:00:{trade_id:02d}Z', 100 + trade_id, 1.0))
+    wait_for(lambda: stream.last_trade_ids.get('BTC-USD') == 3)
+    connection.drop()
+
+    # After reconnecting the feed replays the last match and matches the client already has.
+    connection, _ = subscribed(server)
+    connection.send(match(3, '2024-01-01T00:00:03Z', 103, 1.0, message_type='last_match'))
+    for trade_id in (2, 3, 4):
+        connection.send(match(trade_id, f'2024-01-01T00:00:{trade_id:02d}Z', 100 + trade_id, 1.0))
+    wait_for(lambda: stream.last_trade_ids.get('BTC-USD') == 4)
+
+    candle = stream.get_candles('BTC-USD', 60).iloc[-1]
+    assert candle['volume'] == 4.0
+    assert (candle['open'], candle['high'], candle['low'], candle['close']) == (101, 104, 101, 104)
+
+
+def test_reconnects_after_server_drops_connection(server, stream):
+    connection, _ = subscribed(server)
+    assert stream.connected.wait(5)
+    connection.drop()
+    wait_for(lambda: not stream.connected.is_set())
+
+    connection, message = subscribed(server)
+    assert message['type'] == 'subscribe'
+    assert stream.connected.wait(5)
+    assert stream.reconnects == 1
+
+    connection.send({'type': 'ticker', 'product_id': 'ETH-USD', 'price': '2500', 'time': '2024-01-01T00:00:00Z'})
+    wait_for(lambda: stream.get_ticker('ETH-USD') is not None)
+    assert stream.get_ticker('ETH-USD')['bid'] == 2500.0
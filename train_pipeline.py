@@ -0,0 +1,318 @@
+"""
+Headless LSTM training driver.
+
+Loads the candle CSV (or a local candle store) once, groups it by product and trains one model
+per product in parallel worker processes. Each worker is limited to a few BLAS/TensorFlow threads so the workers do not
+oversubscribe the CPU. A manifest in the model directory records the last candle and the training
+settings of each model, so re-runs skip products whose models are already current. Each new model is also
+exported to a compact `.npz` for TensorFlow-free serving (see `model_export.py`), and the export's
+accuracy against the Keras model is reported.
+
+Usage:
+    python train_pipeline.py 900_gran_data.csv --save-dir models_900 --workers 4 --threads-per-worker 2
+    python train_pipeline.py data/candles --save-dir models_900 --start 2020-01-01
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore
+from indicators import TRAINING_INDICATORS, compute_indicators
+from model_export import EXPORT_DTYPES, export_and_check, export_path
+from windowing import make_tf_dataset, split_and_scale_windows, validation_split
+
+FEATURE_COLUMNS = ['low', 'high', 'open', 'close', 'volume', 'SMA_7', 'EMA_7', 'SMA_30', 'EMA_30']
+MANIFEST_FILE = 'training_manifest.json'
+
+
+def load_product_frames(source, product_ids=None, start=None, end=None):
+    """
+    Loads the candles once and returns one preprocessed frame per product.
+    Parameters:
+    - source: Path of a candle CSV (product_id, time, low, high, open, close, volume columns)
+      or the root directory of a `CandleStore`.
+    - product_ids: Optional subset of products to keep.
+    - start, end: Optional time range; pushed down to the scan when reading a candle store.
+    Returns:
+    - A dict mapping product_id to a time-sorted DataFrame with the training indicators.
+    """
+    if os.path.isdir(source):
+        df = CandleStore(source).read(product_ids, start, end)
+    else:
+        df = pd.read_csv(source)
+        if product_ids is not None:
+            df = df[df['product_id'].isin(product_ids)]
+        df = df.drop_duplicates()
+        df['time'] = pd.to_datetime(df['time'])
+        if start is not None:
+            df = df[df['time'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['time'] <= pd.Timestamp(end)]
+
+    frames = {}
+    for product_id, product_data in df.groupby('product_id', sort=False):
+        product_data = product_data.sort_values(by=['time']).reset_index(drop=True)
+        product_data = compute_indicators(product_data, TRAINING_INDICATORS)
+        frames[product_id] = product_data.bfill()
+    return frames
+
+
+def build_and_train_model(X_train, y_train, sequence_length, epochs, batch_size, verbose=0):
+    """Builds the two-layer LSTM and trains it with early stopping on the last 20% of the training windows."""
+    from tensorflow.keras.callbacks import EarlyStopping
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential([
+        LSTM(50, return_sequences=True, input_shape=(sequence_length, X_train.shape[2])),
+        Dropout(0.2),
+        LSTM(50, return_sequences=False),
+        Dropout(0.2),
+        Dense(1)
+    ])
+    model.compile(optimizer='adam', loss='mean_squared_error')
+
+    early_stopping = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
+    X_fit, X_val, y_fit, y_val = validation_split(X_train, y_train, validation_fraction=0.2)
+    model.fit(
+        make_tf_dataset(X_fit, y_fit, batch_size, shuffle=True), epochs=epochs,
+        validation_data=make_tf_dataset(X_val, y_val, batch_size),
+        verbose=verbose, callbacks=[early_stopping]
+    )
+    return model
+
+
+def save_model_and_scalers(model, scaler_X, scaler_y, product_id, save_dir):
+    """Saves `model_{product_id}.h5` and the pickled scalers next to it."""
+    from tensorflow.keras.models import save_model
+
+    os.makedirs(save_dir, exist_ok=True)
+    save_model(model, os.path.join(save_dir, f"model_{product_id}.h5"))
+    with open(os.path.join(save_dir, f"scaler_X_{product_id}.pkl"), 'wb') as f:
+        pickle.dump(scaler_X, f)
+    with open(os.path.join(save_dir, f"scaler_y_{product_id}.pkl"), 'wb') as f:
+        pickle.dump(scaler_y, f)
+
+
+def evaluate_and_save_predictions(model, X_test, y_test, dates_test, scaler_y, product_id, save_dir):
+    """Predicts the test windows, writes `predictions_{product_id}.csv` and returns the RMSE."""
+    y_pred = scaler_y.inverse_transform(model.predict(make_tf_dataset(X_test, batch_size=256), verbose=0))
+    y_test_rescaled = scaler_y.inverse_transform(y_test)
+    rmse = float(np.sqrt(np.mean((y_test_rescaled - y_pred) ** 2)))
+
+    pd.DataFrame({
+        'Date': dates_test,
+        'Actual': y_test_rescaled.flatten(),
+        'Prediction': y_pred.flatten()
+    }).to_csv(os.path.join(save_dir, f"predictions_{product_id}.csv"), index=False)
+    return rmse
+
+
+THREAD_LIMIT_VARIABLES = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                          'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS')
+
+
+@contextmanager
+def _worker_environment(threads_per_worker):
+    """
+    Sets the thread-limit variables for worker processes spawned inside the block.
+    They have to be in the parent's environment: a spawned worker imports NumPy (and with it the
+    BLAS pools) while unpickling the initializer, before any code of ours runs in it.
+    """
+    saved = {var: os.environ.get(var) for var in THREAD_LIMIT_VARIABLES + ('TF_CPP_MIN_LOG_LEVEL',)}
+    os.environ.update({var: str(threads_per_worker) for var in THREAD_LIMIT_VARIABLES})
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _init_worker(threads_per_worker):
+    """Caps TensorFlow's thread pools in a worker process."""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads_per_worker)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def training_config(sequence_length, epochs, batch_size, export_dtype):
+    """The settings a model was trained and exported with, as recorded in the manifest."""
+    return {
+        'sequence_length': sequence_length,
+        'epochs': epochs,
+        'batch_size': batch_size,
+        'export_dtype': export_dtype
+    }
+
+
+def train_product(product_id, product_data, sequence_length, epochs, batch_size, save_dir, export_dtype='float16'):
+    """
+    Trains, evaluates and saves the model of one product. Runs inside a worker process.
+    Returns:
+    - A dict with the product's RMSE, row count, last candle time, training settings (`config`) and
+      training duration, plus the export report under `export` when `export_dtype` is set.
+    """
+    started = time.time()
+    X_train, X_test, y_train, y_test, dates_train, dates_test, scaler_X, scaler_y = split_and_scale_windows(
+        product_data[FEATURE_COLUMNS], product_data['close'], product_data['time'], sequence_length
+    )
+    model = build_and_train_model(X_train, y_train, sequence_length, epochs, batch_size)
+    save_model_and_scalers(model, scaler_X, scaler_y, product_id, save_dir)
+    rmse = evaluate_and_save_predictions(model, X_test, y_test, dates_test, scaler_y, product_id, save_dir)
+    result = {
+        'product_id': product_id,
+        'rmse': rmse,
+        'rows': len(product_data),
+        'last_time': product_data['time'].iloc[-1].isoformat(),
+        'config': training_config(sequence_length, epochs, batch_size, export_dtype),
+        'trained_at': pd.Timestamp.now(tz='UTC').isoformat(),
+        'duration': time.time() - started
+    }
+    if export_dtype:
+        # The test windows double as the accuracy check of the export.
+        result['export'] = export_and_check(
+            model, scaler_X, scaler_y, export_path(save_dir, product_id), X_test, y_test, export_dtype
+        )
+    return result
+
+
+def load_manifest(save_dir):
+    path = os.path.join(save_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, save_dir):
+    os.makedirs(save_dir, exist_ok=True)
+    path = os.path.join(save_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def is_model_current(product_id, product_data, manifest, save_dir, config):
+    """
+    A model is current when its files exist and it was trained on the product's latest candle with
+    the same settings; a model trained with another `sequence_length` would not fit the windows
+    the inference service builds. Entries written before settings were recorded never match.
+    """
+    entry = manifest.get(product_id)
+    if entry is None or not os.path.exists(os.path.join(save_dir, f"model_{product_id}.h5")):
+        return False
+    if config['export_dtype'] and not os.path.exists(export_path(save_dir, product_id)):
+        return False
+    return entry.get('last_time') == product_data['time'].iloc[-1].isoformat() and entry.get('config') == config
+
+
+def run_training(csv_path, sequence_length=192, epochs=15, batch_size=32, save_dir="models_900",
+                 workers=None, threads_per_worker=2, product_ids=None, force=False, frames=None,
+                 start=None, end=None, export_dtype='float16'):
+    """
+    Trains every product in parallel and returns the per-product results.
+    Parameters:
+    - csv_path: Candle CSV or candle store directory to train from (ignored when `frames` is given).
+    - sequence_length: Number of past timesteps per input window (192 = 48h of 15-minute candles).
+    - epochs, batch_size: Keras training parameters.
+    - save_dir: Directory for models, scalers, predictions, RMSE summary and manifest.
+    - workers: Number of worker processes (defaults to CPU count // threads_per_worker).
+    - threads_per_worker: BLAS/TensorFlow threads per worker process.
+    - product_ids: Optional subset of products to train.
+    - force: Retrain products even when their models are current (same last candle and settings).
+    - frames: Optional preloaded {product_id: DataFrame} as returned by `load_product_frames`.
+    - start, end: Optional time range of candles to train on.
+    - export_dtype: Weight type of the `.npz` export ('float16' or 'float32'), or None to skip it.
+    Returns:
+    - A dict mapping product_id to its result; skipped products map to their manifest entry.
+    """
+    if frames is None:
+        frames = load_product_frames(csv_path, product_ids, start, end)
+    manifest = load_manifest(save_dir)
+    config = training_config(sequence_length, epochs, batch_size, export_dtype)
+
+    results = {}
+    pending = {}
+    for product_id, product_data in frames.items():
+        if len(product_data) <= sequence_length:
+            print(f"Skipping {product_id}: only {len(product_data)} rows")
+        elif not force and is_model_current(product_id, product_data, manifest, save_dir, config):
+            print(f"Skipping {product_id}: model is current")
+            results[product_id] = manifest[product_id]
+        else:
+            pending[product_id] = product_data
+    if not pending:
+        return results
+
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    workers = min(workers, len(pending))
+    # TensorFlow is not fork-safe, so workers are spawned fresh.
+    context = multiprocessing.get_context('spawn')
+    with _worker_environment(threads_per_worker), \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                initializer=_init_worker, initargs=(threads_per_worker,)) as executor:
+        futures = {
+            executor.submit(
+                train_product, product_id, product_data, sequence_length, epochs, batch_size, save_dir, export_dtype
+            ): product_id
+            for product_id, product_data in pending.items()
+        }
+        for future in as_completed(futures):
+            product_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error training {product_id}: {e}")
+                continue
+            print(f"RMSE for Product {product_id}: {result['rmse']} ({result['duration']:.0f}s)")
+            export = result.get('export')
+            if export:
+                print(f"Exported {product_id} ({export['dtype']}, {export['bytes'] / 1024:.0f} KB): "
+                      f"RMSE {export['export_rmse']:.4f} vs {export['keras_rmse']:.4f} (Keras), "
+                      f"max difference {export['max_abs_diff']:.4f}")
+            with open(os.path.join(save_dir, "rmse_summary.txt"), "a") as f:
+                f.write(f"Product ID: {product_id}, RMSE: {result['rmse']:.4f}\n")
+            manifest[product_id] = result
+            save_manifest(manifest, save_dir)
+            results[product_id] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train one LSTM per product in parallel.')
+    parser.add_argument('csv_path', help='Candle CSV or candle store directory.')
+    parser.add_argument('--save-dir', default='models_900')
+    parser.add_argument('--sequence-length', type=int, default=192)
+    parser.add_argument('--epochs', type=int, default=15)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--threads-per-worker', type=int, default=2)
+    parser.add_argument('--products', nargs='*', default=None)
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--force', action='store_true', help='Retrain products whose models are current.')
+    parser.add_argument('--export-dtype', choices=EXPORT_DTYPES + ('none',), default='float16',
+                        help='Weight type of the .npz export for CPU inference.')
+    args = parser.parse_args()
+
+    run_training(
+        args.csv_path, args.sequence_length, args.epochs, args.batch_size, args.save_dir,
+        args.workers, args.threads_per_worker, args.products, args.force, start=args.start, end=args.end,
+        export_dtype=None if args.export_dtype == 'none' else args.export_dtype
+    )
+
+
+if __name__ == '__main__':
+    main()
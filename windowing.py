@@ -0,0 +1,124 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.preprocessing import MinMaxScaler
+
+
+def sliding_windows(features, target, dates, sequence_length):
+    """
+    Zero-copy replacement for `create_sequences`.
+    Parameters:
+    - features: 2-D array (timesteps, n_features).
+    - target: 1-D array aligned with `features`.
+    - dates: 1-D array aligned with `features`.
+    - sequence_length: Number of past timesteps in each window.
+    Returns:
+    - X: Read-only strided view of shape (n_windows, sequence_length, n_features), where
+      X[i] == features[i:i + sequence_length]. No window is copied.
+    - y: target[sequence_length:], the value right after each window.
+    - date_seq: dates[sequence_length:].
+    """
+    features = np.asarray(features)
+    n_windows = len(features) - sequence_length
+    if n_windows <= 0:
+        raise ValueError(f'Need more than {sequence_length} rows to build windows, got {len(features)}')
+    X = sliding_window_view(features, sequence_length, axis=0)[:n_windows].transpose(0, 2, 1)
+    return X, np.asarray(target)[sequence_length:], np.asarray(dates)[sequence_length:]
+
+
+def split_and_scale_windows(features, target, dates, sequence_length, train_fraction=0.8, dtype=np.float32):
+    """
+    Splits and scales LSTM inputs like `split_and_scale_data`, but scales the base series once
+    and windows it afterwards, so no (n_windows, sequence_length, n_features) copy is ever made.
+    The scalers are fitted on exactly the rows the training windows cover, so they are identical
+    to the ones fitted on the materialized training windows.
+    Parameters:
+    - features: DataFrame or 2-D array of model inputs.
+    - target: Series or 1-D array of the value to predict.
+    - dates: Series or 1-D array of timestamps.
+    - sequence_length: Number of past timesteps in each window.
+    - train_fraction: Fraction of windows used for training.
+    - dtype: dtype of the scaled base series (Keras trains in float32).
+    Returns:
+    - X_train, X_test, y_train, y_test, dates_train, dates_test, scaler_X, scaler_y, where X_* are
+      strided views into one scaled copy of `features` and y_* have shape (n, 1).
+    """
+    features = np.asarray(features, dtype=float)
+    target = np.asarray(target, dtype=float)
+    dates = np.asarray(dates)
+    n_windows = len(features) - sequence_length
+    train_size = int(train_fraction * n_windows)
+
+    scaler_X = MinMaxScaler()
+    scaler_y = MinMaxScaler()
+    # Training windows 0..train_size-1 span rows 0..train_size+sequence_length-2.
+    scaler_X.fit(features[:train_size + sequence_length - 1])
+    scaler_y.fit(target[sequence_length:sequence_length + train_size].reshape(-1, 1))
+
+    features_scaled = scaler_X.transform(features).astype(dtype, copy=False)
+    target_scaled = scaler_y.transform(target.reshape(-1, 1)).astype(dtype, copy=False)
+
+    X, y, date_seq = sliding_windows(features_scaled, target_scaled, dates, sequence_length)
+    return (
+        X[:train_size], X[train_size:],
+        y[:train_size], y[train_size:],
+        date_seq[:train_size], date_seq[train_size:],
+        scaler_X, scaler_y
+    )
+
+
+def validation_split(X, y, validation_fraction=0.2):
+    """
+    Splits windows into fit and validation parts the way Keras `validation_split` does
+    (the last fraction of samples, before shuffling), returning views.
+    """
+    split_at = int(len(X) * (1 - validation_fraction))
+    return X[:split_at], X[split_at:], y[:split_at], y[split_at:]
+
+
+def iter_batches(X, y=None, batch_size=32, shuffle=False, seed=None):
+    """
+    Yields contiguous batches from windowed views; only one batch is materialized at a time.
+    Parameters:
+    - X: Windowed inputs, e.g. from `sliding_windows`.
+    - y: Optional targets aligned with X.
+    - batch_size: Number of windows per batch.
+    - shuffle: Whether to visit the windows in random order.
+    - seed: Seed for the shuffle order.
+    """
+    order = np.arange(len(X))
+    if shuffle:
+        np.random.default_rng(seed).shuffle(order)
+    for start in range(0, len(order), batch_size):
+        index = order[start:start + batch_size]
+        if not shuffle:
+            index = slice(index[0], index[-1] + 1)
+        if y is None:
+            yield np.ascontiguousarray(X[index])
+        else:
+            yield np.ascontiguousarray(X[index]), np.ascontiguousarray(y[index])
+
+
+def make_tf_dataset(X, y=None, batch_size=32, shuffle=False, seed=None):
+    """
+    Wraps windowed views in a `tf.data.Dataset` that builds batches lazily.
+    Every pass over the dataset (i.e. every epoch) draws a new shuffle order when `shuffle` is set.
+    """
+    import tensorflow as tf
+
+    epoch = {'count': 0}
+
+    def generator():
+        epoch_seed = None if seed is None else seed + epoch['count']
+        epoch['count'] += 1
+        yield from iter_batches(X, y, batch_size, shuffle, epoch_seed)
+
+    x_spec = tf.TensorSpec(shape=(None,) + X.shape[1:], dtype=tf.as_dtype(X.dtype))
+    if y is None:
+        signature = x_spec
+    else:
+        signature = (x_spec, tf.TensorSpec(shape=(None,) + y.shape[1:], dtype=tf.as_dtype(y.dtype)))
+    n_batches = -(-len(X) // batch_size)
+    dataset = tf.data.Dataset.from_generator(generator, output_signature=signature)
+    # Declaring the length lets Keras run every epoch to completion and size its progress bar.
+    dataset = dataset.apply(tf.data.experimental.assert_cardinality(n_batches))
+    return dataset.prefetch(tf.data.AUTOTUNE)